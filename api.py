@@ -14,6 +14,7 @@ import json
 from typing import Optional
 
 from fastapi import FastAPI, HTTPException
+from fastapi.staticfiles import StaticFiles
 
 # Import Vertex AI modules for side effects (e.g. environment loading).  These
 # imports mirror the original API module but are not directly used here.
@@ -35,6 +36,15 @@ except Exception:
 
 app = FastAPI(title="CineForge API", version="0.2.0")
 
+# Serve generated storyboard images over HTTP so the UI can hand the browser a
+# cacheable URL instead of re-embedding every PNG on each Streamlit rerun.
+# Only this folder is exposed; project state under output/ stays private.
+app.mount(
+    "/files/storyboard_images",
+    StaticFiles(directory=os.path.join("output", "storyboard_images"), check_dir=False),
+    name="storyboard_images",
+)
+
 # Project state helpers.  These functions may not be importable when the
 # application is compiled for documentation, so we handle import errors
 # gracefully and set them to None in that case.
@@ -44,10 +54,13 @@ try:
         load_project,
         update_step,
         init_project,
-        migrate_json_states_to_sqlite,
     )
 except Exception:
-    list_projects = load_project = update_step = init_project = migrate_json_states_to_sqlite = None  # type: ignore
+    list_projects = load_project = update_step = init_project = None  # type: ignore
+try:
+    from project_utils import migrate_json_states_to_sqlite
+except Exception:
+    migrate_json_states_to_sqlite = None  # type: ignore
 
 # Celery tasks and ping endpoint.  If Celery or our tasks cannot be
 # imported, we expose 503 errors for those endpoints.
@@ -173,10 +186,18 @@ def submit_ping():
 # Project state endpoints
 
 @app.get("/projects")
-def api_list_projects():
-    if list_projects is None:
+def api_list_projects(expand: Optional[str] = None):
+    """List projects; with ``expand=<name>`` also return that project's state.
+
+    Lets the UI's project panel fetch the list and the selected project in a
+    single round trip.  ``state`` is null when the project does not exist.
+    """
+    if list_projects is None or load_project is None:
         raise HTTPException(status_code=500, detail="State manager unavailable")
-    return {"projects": list_projects()}
+    payload = {"projects": list_projects()}
+    if expand:
+        payload["state"] = load_project(expand)
+    return payload
 
 
 @app.get("/projects/{project}")
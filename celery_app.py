@@ -6,6 +6,8 @@ from celery import Celery
 REDIS_HOST = os.environ.get("REDIS_HOST", "redis")
 REDIS_PORT = int(os.environ.get("REDIS_PORT", "6379"))
 REDIS_DB = int(os.environ.get("REDIS_DB", "0"))
+# Size of the Redis connection pool shared by the broker and result backend.
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", "50"))
 
 broker_url = os.environ.get(
     "CELERY_BROKER_URL", f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
@@ -28,6 +30,20 @@ celery_app.conf.update(
     worker_send_task_events=True,
     task_send_sent_event=True,
     timezone="UTC",
+    # Reuse pooled, keep-alive Redis connections instead of reconnecting and
+    # paying a full round-trip handshake per broker/result operation.
+    broker_pool_limit=REDIS_MAX_CONNECTIONS,
+    broker_transport_options={
+        "socket_keepalive": True,
+        "health_check_interval": 30,
+        "max_connections": REDIS_MAX_CONNECTIONS,
+    },
+    redis_socket_keepalive=True,
+    redis_max_connections=REDIS_MAX_CONNECTIONS,
+    result_backend_transport_options={
+        "socket_keepalive": True,
+        "socket_timeout": 5,
+    },
 )
 
 
@@ -12,8 +12,8 @@ or called directly from a CLI.
 import os
 import json
 import re
-from collections import defaultdict
-from typing import List, Tuple, Optional
+from pathlib import Path
+from typing import Dict, List, Tuple, Optional
 
 import ffmpeg  # type: ignore
 import vertexai
@@ -27,8 +27,27 @@ from .step6_voiceover_generation import generate_voiceover
 from .step7_final_assembly import assemble_film
 
 
+_OUTPUT_DIRS = [
+    os.path.join("output", "narrative_schema"),
+    os.path.join("output", "screenplay"),
+    os.path.join("output", "storyboard_text"),
+    os.path.join("output", "storyboard_images"),
+    os.path.join("output", "video_clips"),
+    os.path.join("output", "soundtracks"),
+    os.path.join("output", "voiceover"),
+    os.path.join("output", "final_film"),
+]
+
+
+def _ensure_output_dirs() -> None:
+    """Create every pipeline output directory; called by each entry point."""
+    for d in _OUTPUT_DIRS:
+        os.makedirs(d, exist_ok=True)
+
+
 def deconstruct_narrative(story_file: str, project: str, location: str) -> str:
     """Deconstruct a raw story into a structured narrative schema using Gemini."""
+    _ensure_output_dirs()
     vertexai.init(project=project, location=location)
     model = GenerativeModel("gemini-2.5-pro")
     with open(story_file, "r", encoding="utf-8") as f:
@@ -78,15 +97,14 @@ def deconstruct_narrative(story_file: str, project: str, location: str) -> str:
     if schema_json.endswith("```"):
         schema_json = schema_json[:-3]
     output_dir = os.path.join("output", "narrative_schema")
-    os.makedirs(output_dir, exist_ok=True)
     schema_filename = os.path.join(output_dir, f"{os.path.splitext(os.path.basename(story_file))[0]}_schema.json")
-    with open(schema_filename, "w", encoding="utf-8") as f:
-        f.write(schema_json)
+    Path(schema_filename).write_text(schema_json, encoding="utf-8")
     return schema_filename
 
 
 def generate_screenplay_and_storyboard(schema_file: str, project: str, location: str) -> Tuple[str, str]:
     """Generate a screenplay and a storyboard from a narrative schema using Gemini."""
+    _ensure_output_dirs()
     vertexai.init(project=project, location=location)
     model = GenerativeModel("gemini-2.5-pro")
     with open(schema_file, "r", encoding="utf-8") as f:
@@ -97,8 +115,6 @@ def generate_screenplay_and_storyboard(schema_file: str, project: str, location:
     project_name = os.path.splitext(os.path.basename(schema_file))[0].replace("_schema", "")
     screenplay_dir = os.path.join("output", "screenplay")
     storyboard_dir = os.path.join("output", "storyboard_text")
-    os.makedirs(screenplay_dir, exist_ok=True)
-    os.makedirs(storyboard_dir, exist_ok=True)
     screenplay_filename = os.path.join(screenplay_dir, f"{project_name}_screenplay.txt")
     storyboard_filename = os.path.join(storyboard_dir, f"{project_name}_storyboard.txt")
     # If both screenplay and storyboard already exist, return them to avoid
@@ -138,10 +154,8 @@ def generate_screenplay_and_storyboard(schema_file: str, project: str, location:
         storyboard_prompt
     ], generation_config=storyboard_config, stream=True)
     storyboard = "".join([r.text for r in storyboard_responses])
-    with open(screenplay_filename, "w", encoding="utf-8") as f:
-        f.write(screenplay)
-    with open(storyboard_filename, "w", encoding="utf-8") as f:
-        f.write(storyboard)
+    Path(screenplay_filename).write_text(screenplay, encoding="utf-8")
+    Path(storyboard_filename).write_text(storyboard, encoding="utf-8")
     return screenplay_filename, storyboard_filename
 
 
@@ -153,6 +167,7 @@ def generate_character_portrait(
     style_prompt: Optional[str] | None = None,
 ) -> str:
     """Generate a single character portrait using Imagen."""
+    _ensure_output_dirs()
     vertexai.init(project=project, location=location)
     model = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
     base_style = style_prompt or "3D cartoon animation, detailed, expressive"
@@ -167,7 +182,6 @@ def generate_character_portrait(
         "storyboard_images",
         f"character_{character_name.lower().replace(' ', '_')}.png",
     )
-    os.makedirs(os.path.dirname(image_path), exist_ok=True)
     images[0].save(location=image_path, include_generation_parameters=True)
     return image_path
 
@@ -179,6 +193,7 @@ def generate_environment_plate(
     style_prompt: Optional[str] | None = None,
 ) -> str:
     """Generate an environment plate using Imagen."""
+    _ensure_output_dirs()
     vertexai.init(project=project, location=location)
     model = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
     base_style = style_prompt or "3D cartoon animation, detailed, expressive"
@@ -192,7 +207,6 @@ def generate_environment_plate(
         "storyboard_images",
         f"environment_{location_name.lower().replace(' ', '_')}.png",
     )
-    os.makedirs(os.path.dirname(image_path), exist_ok=True)
     images[0].save(location=image_path, include_generation_parameters=True)
     return image_path
 
@@ -206,6 +220,7 @@ def generate_storyboard_image(
     style_prompt: Optional[str] | None = None,
 ) -> str:
     """Generate a storyboard image for a single shot using Imagen."""
+    _ensure_output_dirs()
     vertexai.init(project=project, location=location)
     model = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
     prompt = shot_description
@@ -217,7 +232,6 @@ def generate_storyboard_image(
         "storyboard_images",
         f"scene_{scene_number}_shot_{shot_number}.png",
     )
-    os.makedirs(os.path.dirname(image_path), exist_ok=True)
     images[0].save(location=image_path, include_generation_parameters=True)
     return image_path
 
@@ -250,6 +264,7 @@ def synthesize_video_from_storyboard(storyboard_file: str, project: str, locatio
     concatenates all scenes into a single video. Returns the path to the final video file
     or None if no videos were generated.
     """
+    _ensure_output_dirs()
     with open(storyboard_file, "r", encoding="utf-8") as f:
         storyboard_text = f.read()
     # Determine the output directory and final video file path for caching.
@@ -262,20 +277,18 @@ def synthesize_video_from_storyboard(storyboard_file: str, project: str, locatio
         return final_output_path
     shot_regex = re.compile(r"SCENE\s+(\d+),\s*SHOT\s+(\d+):\n(.*?)(?=\nSCENE|\Z)", re.DOTALL)
     matches = shot_regex.findall(storyboard_text)
-    shots_by_scene: dict[int, list[tuple[int, str]]] = defaultdict(list)
+    shots_by_scene: Dict[int, List[Tuple[int, str]]] = {}
     if matches:
         for scene_str, shot_str, description in matches:
             scene_num = int(scene_str)
             shot_num = int(shot_str)
-            shots_by_scene[scene_num].append((shot_num, description.strip()))
+            shots_by_scene.setdefault(scene_num, []).append((shot_num, description.strip()))
     else:
         paragraphs = [p.strip() for p in storyboard_text.split("\n\n") if p.strip()]
         for idx, desc in enumerate(paragraphs):
             scene_num = idx // 10 + 1
             shot_num = idx % 10 + 1
-            shots_by_scene[scene_num].append((shot_num, desc))
-    # Ensure the video clips directory exists for intermediate files.
-    os.makedirs(output_dir, exist_ok=True)
+            shots_by_scene.setdefault(scene_num, []).append((shot_num, desc))
     scene_video_paths: list[str] = []
     for scene_num, scene_shots in sorted(shots_by_scene.items()):
         shot_video_paths: list[str] = []
@@ -320,8 +333,8 @@ def synthesize_video_from_storyboard(storyboard_file: str, project: str, locatio
 
 def generate_soundtrack_for_project(schema_file: str, project: str, location: str) -> str:
     """Generate soundtracks for each scene based on the narrative schema."""
+    _ensure_output_dirs()
     output_dir = os.path.join("output", "soundtracks")
-    os.makedirs(output_dir, exist_ok=True)
     # If the directory already contains one or more audio files, assume
     # the soundtrack has been generated previously and reuse the cached
     # directory.  This avoids unnecessary calls to the music generation model.
@@ -335,8 +348,8 @@ def generate_soundtrack_for_project(schema_file: str, project: str, location: st
 
 def generate_voiceover_for_project(screenplay_file: str, project: str) -> Optional[str]:
     """Generate a single voiceover MP3 for the entire screenplay."""
+    _ensure_output_dirs()
     output_dir = os.path.join("output", "voiceover")
-    os.makedirs(output_dir, exist_ok=True)
     base_name = os.path.splitext(os.path.basename(screenplay_file))[0]
     output_path = os.path.join(output_dir, f"{base_name}_voiceover.mp3")
     # If the voice‑over MP3 already exists, reuse it instead of regenerating.
@@ -354,8 +367,8 @@ def assemble_final_film(
     project: str,
 ) -> str:
     """Assemble the final film from synthesized video clips, voiceover, and soundtrack."""
+    _ensure_output_dirs()
     output_dir = os.path.join("output", "final_film")
-    os.makedirs(output_dir, exist_ok=True)
     output_filename = f"{project}_final_film.mp4"
     final_path = os.path.join(output_dir, output_filename)
     # If the final film already exists, return it immediately to avoid reassembly.
@@ -13,13 +13,25 @@ and final film assembly.
 import os
 import json
 import re
+import functools
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
 
 
 PROJECTS_DIR = "output/projects"
 os.makedirs(PROJECTS_DIR, exist_ok=True)
 
+# Characters not allowed in a project state filename.
+_SANITIZE = re.compile(r"[^a-zA-Z0-9_-]")
+# Filename suffixes stripped when mapping artefacts back to a project name.
+_SCHEMA_SUFFIX = re.compile(r"_schema$")
+_STORYBOARD_SUFFIX = re.compile(r"_storyboard$")
+
 # Canonical step keys for the extended pipeline
 PIPELINE_STEPS = [
     "narrative_deconstructed",  # outputs: schema_file
@@ -32,15 +44,24 @@ PIPELINE_STEPS = [
     "final_film_assembled",     # outputs: final_film_file
 ]
 
+# Only the most recent history events are kept in the state file so that
+# save_project cost does not grow with the age of the project.
+HISTORY_LIMIT = 500
+
+# Digest of the last state written to (or read from) disk, per project.  Used
+# by save_project to skip rewriting a file whose content would not change.
+_last_hash: Dict[str, int] = {}
+
 
 def _now_iso() -> str:
     """Return the current UTC time in ISO 8601 format with a 'Z' suffix."""
     return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
 
 
+@functools.lru_cache(maxsize=512)
 def get_project_path(project_name: str) -> str:
     """Return the filesystem path where the project state JSON should be stored."""
-    safe_name = re.sub(r"[^a-zA-Z0-9_-]", "_", project_name)
+    safe_name = _SANITIZE.sub("_", project_name)
     return os.path.join(PROJECTS_DIR, f"{safe_name}.json")
 
 
@@ -73,24 +94,88 @@ def _default_state(project_name: str) -> Dict[str, Any]:
     }
 
 
-def save_project(project_name: str, state: Dict[str, Any]) -> None:
-    """Write the project state to disk atomically."""
+def _serialize(state: Dict[str, Any]) -> bytes:
+    """Encode a state dict as indented UTF-8 JSON, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(state, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(state, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _deserialize(data: bytes) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _fsync_dir(path: str) -> None:
+    """Flush a directory entry so a preceding rename survives power loss."""
+    if os.name == "nt":
+        return
+    dir_fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def save_project(project_name: str, state: Dict[str, Any], durable: bool = False) -> None:
+    """Write the project state to disk atomically.
+
+    The write is skipped when the serialized state is identical to what was
+    last written or loaded for this project and the file is still present.
+    With ``durable=True`` the file and its directory are fsynced, so the new
+    state survives a crash or power loss rather than only a process exit.
+    """
     path = get_project_path(project_name)
+    data = _serialize(state)
+    digest = hash(data)
+    if _last_hash.get(project_name) == digest and os.path.exists(path):
+        return
     tmp_path = path + ".tmp"
-    with open(tmp_path, "w", encoding="utf-8") as f:
-        json.dump(state, f, indent=2, ensure_ascii=False)
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
     os.replace(tmp_path, path)
+    if durable:
+        _fsync_dir(os.path.dirname(path) or ".")
+    _last_hash[project_name] = digest
 
 
 def load_project(project_name: str) -> Optional[Dict[str, Any]]:
     """Load the project state from disk, or return None if missing."""
     path = get_project_path(project_name)
     if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(path, "rb") as f:
+            state = _deserialize(f.read())
+        # Re-sync the cached digest with what is actually on disk.
+        _last_hash[project_name] = hash(_serialize(state))
+        return state
+    _last_hash.pop(project_name, None)
     return None
 
 
+def list_projects() -> List[str]:
+    """Return the names of all projects with a state file, sorted."""
+    try:
+        with os.scandir(PROJECTS_DIR) as it:
+            return sorted(
+                os.path.splitext(e.name)[0]
+                for e in it
+                if e.name.endswith((".json",)) and e.is_file()
+            )
+    except FileNotFoundError:
+        return []
+
+
+def _append_history(state: Dict[str, Any], event: Dict[str, Any]) -> None:
+    history = state.setdefault("history", [])
+    history.append(event)
+    if len(history) > HISTORY_LIMIT:
+        del history[:-HISTORY_LIMIT]
+
+
 def init_project(project_name: str) -> Dict[str, Any]:
     """Ensure that a state file exists for the given project and return it."""
     state = load_project(project_name)
@@ -105,37 +190,16 @@ def ensure_project(project_name: str) -> Dict[str, Any]:
     return init_project(project_name)
 
 
-def update_step(
-    project_name: str,
+def _apply_step_update(
+    state: Dict[str, Any],
     step_key: str,
-    *,
     status: Optional[str] = None,
     outputs: Optional[Dict[str, Any]] = None,
     error: Optional[str] = None,
-) -> Dict[str, Any]:
-    """
-    Update the status, outputs and/or error for a pipeline step on the given project.
-
-    Parameters
-    ----------
-    project_name: str
-        The identifier for the project whose state should be updated.
-    step_key: str
-        The canonical or custom key representing the pipeline step.
-    status: Optional[str]
-        The new status ("running", "success", or "failed").
-    outputs: Optional[dict]
-        A mapping of output artefacts produced by the step.
-    error: Optional[str]
-        An error message if the step failed.
-
-    Returns
-    -------
-    dict
-        The updated project state.
-    """
-    state = ensure_project(project_name)
+) -> bool:
+    """Apply one step update to ``state`` in memory; return True if it is terminal."""
     steps = state.setdefault("steps", {})
+    changed = bool(status or error)
     if step_key not in steps:
         # allow registration of custom steps
         steps[step_key] = {
@@ -145,6 +209,7 @@ def update_step(
             "error": None,
             "outputs": {},
         }
+        changed = True
     step = steps[step_key]
     now = _now_iso()
     prev_status = step.get("status")
@@ -154,13 +219,15 @@ def update_step(
             step["started_at"] = now
         if status in {"success", "failed"}:
             step["finished_at"] = now
-        state.setdefault("history", []).append({
+        _append_history(state, {
             "time": now,
             "event": f"step:{step_key}:{status}",
             "meta": {"prev": prev_status},
         })
     if outputs:
         step_outputs = step.setdefault("outputs", {})
+        if any(step_outputs.get(k) != v for k, v in outputs.items()):
+            changed = True
         step_outputs.update(outputs)
         # Mirror important artefacts to top-level keys if present
         artifacts = state.setdefault("artifacts", {})
@@ -181,15 +248,67 @@ def update_step(
         if not status:
             step["status"] = "failed"
             step["finished_at"] = now
-        state.setdefault("history", []).append({
+        _append_history(state, {
             "time": now,
             "event": f"step:{step_key}:error",
             "meta": {"error": error[:500]},
         })
-    state["updated_at"] = now
-    save_project(project_name, state)
+    if changed:
+        state["updated_at"] = now
+    return status in {"success", "failed"} or bool(error and not status)
+
+
+def update_step(
+    project_name: str,
+    step_key: str,
+    *,
+    status: Optional[str] = None,
+    outputs: Optional[Dict[str, Any]] = None,
+    error: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Update the status, outputs and/or error for a pipeline step on the given project.
+
+    Parameters
+    ----------
+    project_name: str
+        The identifier for the project whose state should be updated.
+    step_key: str
+        The canonical or custom key representing the pipeline step.
+    status: Optional[str]
+        The new status ("running", "success", or "failed").
+    outputs: Optional[dict]
+        A mapping of output artefacts produced by the step.
+    error: Optional[str]
+        An error message if the step failed.
+
+    Returns
+    -------
+    dict
+        The updated project state.
+    """
+    return update_steps(project_name, {step_key: {"status": status, "outputs": outputs, "error": error}})
+
+
+def update_steps(project_name: str, updates: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply several step updates with a single load and a single save.
+
+    ``updates`` maps step keys to ``update_step`` keyword arguments (status,
+    outputs, error).  Use it where a caller changes adjacent steps together,
+    e.g. finishing one step and starting the next, so the state file is
+    written once instead of once per step.
+    """
+    state = ensure_project(project_name)
+    terminal = False
+    for step_key, kwargs in updates.items():
+        terminal = _apply_step_update(state, step_key, **kwargs) or terminal
+    # No-op updates (e.g. retried or polling callers) leave the state
+    # untouched, so save_project can skip the rewrite.  Only terminal
+    # transitions pay for fsync; intermediate progress is best effort.
+    save_project(project_name, state, durable=terminal)
     return state
 
+
 # -----------------------------------------------------------------------------
 # Helper functions to derive a project name from various types of input files.
 #
@@ -232,7 +351,7 @@ def derive_project_name_from_schema_file(schema_file: str) -> str:
         The inferred project name.
     """
     base = os.path.splitext(os.path.basename(schema_file))[0]
-    return base.replace("_schema", "")
+    return _SCHEMA_SUFFIX.sub("", base)
 
 
 def derive_project_name_from_storyboard_file(storyboard_file: str) -> str:
@@ -251,4 +370,4 @@ def derive_project_name_from_storyboard_file(storyboard_file: str) -> str:
         The inferred project name.
     """
     base = os.path.splitext(os.path.basename(storyboard_file))[0]
-    return base.replace("_storyboard", "")
\ No newline at end of file
+    return _STORYBOARD_SUFFIX.sub("", base)
\ No newline at end of file
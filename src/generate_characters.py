@@ -1,64 +1,81 @@
 import argparse
-import json
+import concurrent.futures
 import os
-import vertexai
-from vertexai.vision_models import ImageGenerationModel
+import sys
+try:
+    from . import utils, vertex_init  # type: ignore
+except Exception:
+    # Allow running as a script: python src/generate_characters.py
+    sys.path.append(os.path.dirname(__file__))
+    import utils  # type: ignore
+    import vertex_init  # type: ignore
 
-def generate_character_portrait(character_name, character_description, project, location, style):
+
+def generate_character_portrait(character_name, character_description, project, location, style_prompt):
     """Generates a character portrait using Imagen."""
     print(f"Generating portrait for {character_name}...")
-    vertexai.init(project=project, location=location)
-    model = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
-
-    with open("config.json", "r") as f:
-        config = json.load(f)
-        style_prompt = config["styles"].get(style, "")
-
     prompt = (
         f"A full-body character concept art of {character_name}. "
         f"Description: {character_description}. "
         f"Art style: {style_prompt}."
     )
 
+    image_path = os.path.join(
+        "output", "visual_assets", f"character_{character_name.lower().replace(' ', '_')}.png"
+    )
+    if utils.prompt_cache_hit(image_path, prompt, model=vertex_init.IMAGE_MODEL, aspect_ratio="9:16"):
+        print(f"cache hit: {image_path}")
+        return image_path
+
+    model = vertex_init.get_image_model(project, location)
+
     images = model.generate_images(
         prompt=prompt,
         number_of_images=1,
         aspect_ratio="9:16"
     )
 
-    image_path = os.path.join(
-        "output", "visual_assets", f"character_{character_name.lower().replace(' ', '_')}.png"
-    )
-    os.makedirs(os.path.dirname(image_path), exist_ok=True)
     images[0].save(location=image_path, include_generation_parameters=True)
+    utils.record_prompt(image_path, prompt, model=vertex_init.IMAGE_MODEL, aspect_ratio="9:16")
     print(f"Saved character portrait to {image_path}")
     return image_path
 
 
-def generate_characters(schema_file, project, location):
+def generate_characters(schema_file, project, location, concurrency=8):
     try:
-        with open(schema_file, "r") as f:
-            narrative_schema = json.load(f)
+        narrative_schema = utils.load_json(schema_file)
     except FileNotFoundError as e:
         print(f"Error: {e}")
         return
 
+    # Created once here rather than on every save in the worker threads.
+    os.makedirs(os.path.join("output", "visual_assets"), exist_ok=True)
+
     project_settings_file = "output/project_settings.json"
     style = "photorealistic"  # default style
     if os.path.exists(project_settings_file):
-        with open(project_settings_file, "r") as f:
-            project_settings = json.load(f)
-            style = project_settings.get("style", style)
-
-    characters = narrative_schema.get("characters", [])
-    for character in characters:
-        generate_character_portrait(
-            character.get("name"),
-            character.get("description"),
-            project,
-            location,
-            style,
-        )
+        style = utils.load_json(project_settings_file).get("style", style)
+
+    # Resolve the style prompt once rather than re-reading config.json per character.
+    style_prompt = utils.resolve_style_prompt(style)
+
+    # A character listed twice (or with different casing/spacing) is drawn once.
+    unique = {}
+    for c in narrative_schema.get("characters", []):
+        if c.get("name"):
+            unique.setdefault(utils.normalize_asset_key(c["name"]), c)
+    characters = list(unique.values())
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+        list(ex.map(
+            lambda c: generate_character_portrait(
+                c.get("name"),
+                c.get("description"),
+                project,
+                location,
+                style_prompt,
+            ),
+            characters,
+        ))
 
     print("\nCharacter portrait generation complete.")
 
@@ -72,9 +89,10 @@ def main():
     parser.add_argument(
         "--location", help="The Google Cloud location.", default="us-central1"
     )
+    utils.add_concurrency_args(parser)
     args = parser.parse_args()
 
-    generate_characters(args.schema_file, args.project, args.location)
+    generate_characters(args.schema_file, args.project, args.location, args.concurrency)
 
 
 if __name__ == "__main__":
@@ -1,23 +1,31 @@
 import argparse
-import json
+import concurrent.futures
+import itertools
 import os
 import sys
-import vertexai
-from vertexai.vision_models import ImageGenerationModel
+import threading
 try:
-    from . import utils  # type: ignore
+    from . import utils, vertex_init  # type: ignore
 except Exception:
     # Allow running as a script: python src/generate_environments.py
     sys.path.append(os.path.dirname(__file__))
     import utils  # type: ignore
+    import vertex_init  # type: ignore
 
-def generate_environment_plate(location_name, project, gcp_location, style_profile):
+
+# Serializes progress output from pool workers so lines do not interleave.
+_print_lock = threading.Lock()
+
+
+def _log(msg):
+    with _print_lock:
+        print(msg)
+
+
+def generate_environment_plate(location_name, project, gcp_location, style_profile, force=False):
     """Generates an environment plate using Imagen, honoring a style_profile for consistency."""
-    print(f"Generating environment plate for {location_name}...")
+    _log(f"Generating environment plate for {location_name}...")
     try:
-        vertexai.init(project=project, location=gcp_location)
-        model = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
-
         # Resolve style prompt from config; fallback to the provided style_profile itself.
         style_prompt = utils.resolve_style_prompt(style_profile)
 
@@ -26,39 +34,59 @@ def generate_environment_plate(location_name, project, gcp_location, style_profi
             f"Art style: {style_prompt}, cinematic lighting."
         )
 
+        image_path = os.path.join("output", "visual_assets", f"environment_{location_name.lower().replace(' ', '_')}.png")
+        if utils.prompt_cache_hit(image_path, prompt, force=force, model=vertex_init.IMAGE_MODEL, aspect_ratio="16:9"):
+            _log(f"cache hit: {image_path}")
+            return image_path
+
+        model = vertex_init.get_image_model(project, gcp_location)
+
         images = model.generate_images(
             prompt=prompt,
             number_of_images=1,
             aspect_ratio="16:9"
         )
 
-        image_path = os.path.join("output", "visual_assets", f"environment_{location_name.lower().replace(' ', '_')}.png")
-        os.makedirs(os.path.dirname(image_path), exist_ok=True)
         images[0].save(location=image_path, include_generation_parameters=True)
-        print(f"Saved environment plate to {image_path}")
+        utils.record_prompt(image_path, prompt, model=vertex_init.IMAGE_MODEL, aspect_ratio="16:9")
+        _log(f"Saved environment plate to {image_path}")
         return image_path
     except Exception as e:
-        print(f"Error generating environment plate for {location_name}: {e}")
+        _log(f"Error generating environment plate for {location_name}: {e}")
         return None
 
 
-def generate_environments(schema_file, project, gcp_location):
+def generate_environments(schema_file, project, gcp_location, concurrency=4, force=False):
     try:
-        with open(schema_file, "r") as f:
-            narrative_schema = json.load(f)
+        narrative_schema = utils.load_json(schema_file)
     except FileNotFoundError as e:
         print(f"Error: {e}")
         return
 
+    # Created once here rather than on every save in the worker threads.
+    os.makedirs(os.path.join("output", "visual_assets"), exist_ok=True)
+
     style_profile = utils.resolve_style_profile(None, None)
 
-    locations = list(set(scene.get("setting") for scene in narrative_schema.get("scenes", [])))
-    for scene_location in locations:
-        if not scene_location:
-            continue
-        generate_environment_plate(scene_location, project, gcp_location, style_profile)
+    # Settings differing only in case or spacing share one plate; first-seen
+    # scene order is kept.
+    locations = utils.dedupe_by_name(s.get("setting") for s in narrative_schema.get("scenes", []))
+    # A comma-separated location spreads requests round-robin across regions
+    # to draw on several per-region Imagen quotas.
+    regions = itertools.cycle(utils.parse_regions(gcp_location) or [gcp_location])
+    paths = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+        futures = [
+            ex.submit(generate_environment_plate, loc, project, region, style_profile, force)
+            for loc, region in zip(locations, regions)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            path = future.result()
+            if path:
+                paths.append(path)
 
     print("\nEnvironment plate generation complete.")
+    return paths
 
 
 def main():
@@ -68,9 +96,17 @@ def main():
     parser.add_argument("schema_file", help="The path to the narrative schema JSON file.")
     utils.add_vertex_args(parser)
     utils.add_style_args(parser)
+    utils.add_concurrency_args(parser, default=4)
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate plates even if one exists for the same prompt.",
+    )
     args = parser.parse_args()
 
-    generate_environments(args.schema_file, args.project, args.location)
+    generate_environments(
+        args.schema_file, args.project, args.location, args.concurrency, force=args.force
+    )
 
 
 if __name__ == "__main__":
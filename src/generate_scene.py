@@ -4,13 +4,15 @@ import sys
 
 try:
     from .generate_storyboard_images import generate_storyboard_images  # type: ignore
+    from . import utils  # type: ignore
 except Exception:
     sys.path.append(os.path.dirname(__file__))
     from generate_storyboard_images import generate_storyboard_images  # type: ignore
+    import utils  # type: ignore
 
 
 def generate_scene(
-    storyboard_file, scene_number, project, location, narrative_schema_file=None
+    storyboard_file, scene_number, project, location, narrative_schema_file=None, concurrency=6
 ):
     """Generates all shots for a given scene."""
     generate_storyboard_images(
@@ -19,6 +21,7 @@ def generate_scene(
         project,
         location,
         scene=scene_number,
+        concurrency=concurrency,
     )
 
 
@@ -36,7 +39,14 @@ if __name__ == "__main__":
     parser.add_argument(
         "--location", help="The Google Cloud location.", default="us-central1"
     )
+    utils.add_concurrency_args(parser, default=6)
     args = parser.parse_args()
 
-    generate_scene(args.storyboard_file, args.scene_number, args.project, args.location)
+    generate_scene(
+        args.storyboard_file,
+        args.scene_number,
+        args.project,
+        args.location,
+        concurrency=args.concurrency,
+    )
 
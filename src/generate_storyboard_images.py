@@ -1,16 +1,79 @@
 import argparse
-import json
+import concurrent.futures
+import itertools
 import re
 import os
 import sys
-import vertexai
-from vertexai.vision_models import ImageGenerationModel
 try:
-    from . import utils  # type: ignore
+    from . import utils, vertex_init  # type: ignore
 except Exception:
     # Allow running as a script: python src/generate_storyboard_images.py
     sys.path.append(os.path.dirname(__file__))
     import utils  # type: ignore
+    import vertex_init  # type: ignore
+
+
+def _shot_image_path(scene_number, shot_number):
+    return os.path.join("output", "visual_assets", f"scene_{scene_number}_shot_{shot_number}.png")
+
+
+def _save_image(image, image_path, prompt, number_of_images=1):
+    """Write an image atomically, then record the prompt it was generated from.
+
+    Returns image_path; a failed write is reported and re-raised.
+    """
+    try:
+        root, ext = os.path.splitext(image_path)
+        # Keep the real extension last so the image format is still inferred.
+        tmp_path = f"{root}.tmp{ext}"
+        image.save(location=tmp_path, include_generation_parameters=True)
+        os.replace(tmp_path, image_path)
+        # Images from a batched request are distinct variants of one prompt, so
+        # they only get their sidecar and never a shared cache entry, which
+        # would hand every shot of the batch the same picture.
+        utils.record_prompt(
+            image_path,
+            prompt,
+            store=number_of_images == 1,
+            model=vertex_init.IMAGE_MODEL,
+            aspect_ratio="16:9",
+            number_of_images=number_of_images,
+        )
+        print(f"Saved storyboard image to {image_path}")
+        return image_path
+    except Exception as e:
+        print(f"Error saving storyboard image to {image_path}: {e}")
+        raise
+
+
+def _store_image(image, image_path, prompt, writer=None, number_of_images=1):
+    # Hand disk writes to the writer pool when one is given, so the calling
+    # thread can move straight on to its next Imagen request.  The caller gets
+    # the pool's future back and must check it; a synchronous save returns the
+    # path (or raises).
+    if writer is not None:
+        return writer.submit(_save_image, image, image_path, prompt, number_of_images)
+    return _save_image(image, image_path, prompt, number_of_images)
+
+
+def _build_prompt(shot_description, scene_number, style_profile, narrative_schema=None):
+    # Resolve style prompt from config; fallback to the provided style_profile string itself.
+    style_prompt = utils.resolve_style_prompt(style_profile)
+
+    characters_in_shot = utils.get_characters_in_shot(shot_description, narrative_schema or {})
+    scene_setting = utils.get_scene_setting(int(scene_number), narrative_schema or {})
+
+    parts = [shot_description, "\n\n"]
+    if characters_in_shot:
+        parts.append(f"Use the character portrait for '{', '.join(characters_in_shot)}' ")
+    if scene_setting:
+        parts.append(f"and the environment plate for '{scene_setting}' ")
+    if characters_in_shot or scene_setting:
+        parts.append("as a reference for this shot.\n\n")
+
+    parts.append(f"Style: {style_prompt}")
+    return "".join(parts)
+
 
 def generate_storyboard_image(
     shot_description,
@@ -20,42 +83,40 @@ def generate_storyboard_image(
     gcp_location,
     style_profile,
     narrative_schema=None,
+    model=None,
+    force=False,
+    writer=None,
+    prompt=None,
 ):
-    """Generates a storyboard image for a shot, honoring a style_profile for visual coherence."""
+    """Generates a storyboard image for a shot, honoring a style_profile for visual coherence.
+
+    Pass a pre-initialized ``model`` to share one Imagen client across shots.
+    An existing image generated from the same prompt is reused unless ``force``.
+    With a ``writer`` executor the save happens asynchronously on that pool and
+    a future resolving to the saved path is returned instead of the path.
+    A ``prompt`` built ahead of time by the caller is used as-is.
+    """
     print(f"Generating image for Scene {scene_number}, Shot {shot_number}...")
     try:
-        vertexai.init(project=project, location=gcp_location)
-        model = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
-
-        # Resolve style prompt from config; fallback to the provided style_profile string itself.
-        style_prompt = utils.resolve_style_prompt(style_profile)
-
-        characters_in_shot = utils.get_characters_in_shot(shot_description, narrative_schema or {})
-        scene_setting = utils.get_scene_setting(int(scene_number), narrative_schema or {})
+        if prompt is None:
+            prompt = _build_prompt(shot_description, scene_number, style_profile, narrative_schema)
+        image_path = _shot_image_path(scene_number, shot_number)
+        if utils.prompt_cache_hit(image_path, prompt, force=force, model=vertex_init.IMAGE_MODEL, aspect_ratio="16:9"):
+            print(f"cache hit: {image_path}")
+            return image_path
 
-        prompt = f"{shot_description}\n\n"
-        if characters_in_shot:
-            prompt += f"Use the character portrait for '{', '.join(characters_in_shot)}' "
-        if scene_setting:
-            prompt += f"and the environment plate for '{scene_setting}' "
-        if characters_in_shot or scene_setting:
-            prompt += "as a reference for this shot.\n\n"
+        if model is None:
+            model = vertex_init.get_image_model(project, gcp_location)
 
-        prompt += f"Style: {style_prompt}"
-
-        images = model.generate_images(
+        # Retry transient Vertex errors (quota, 5xx) before giving up on the shot.
+        images = utils.retry_call(
+            model.generate_images,
             prompt=prompt,
             number_of_images=1,
             aspect_ratio="16:9",
         )
 
-        image_path = os.path.join(
-            "output", "visual_assets", f"scene_{scene_number}_shot_{shot_number}.png"
-        )
-        os.makedirs(os.path.dirname(image_path), exist_ok=True)
-        images[0].save(location=image_path, include_generation_parameters=True)
-        print(f"Saved storyboard image to {image_path}")
-        return image_path
+        return _store_image(images[0], image_path, prompt, writer)
     except Exception as e:
         print(
             f"Error generating storyboard image for Scene {scene_number}, Shot {shot_number}: {e}"
@@ -63,6 +124,41 @@ def generate_storyboard_image(
         return None
 
 
+def _generate_storyboard_batch(prompt, shot_keys, model, writer=None):
+    """Generate several shots that share an identical prompt in one Imagen request.
+
+    Returns one entry per shot, as ``_store_image`` does: a path, or a save
+    future when a ``writer`` is given.  Shots that Imagen returned no image
+    for (e.g. safety-filtered) are retried one at a time.
+    """
+    label = ", ".join(f"Scene {sc} Shot {sh}" for sc, sh in shot_keys)
+    print(f"Generating {len(shot_keys)} images in one request for {label}...")
+    try:
+        images = utils.retry_call(
+            model.generate_images,
+            prompt=prompt,
+            number_of_images=len(shot_keys),
+            aspect_ratio="16:9",
+        )
+        images = list(images)
+        paths = []
+        for image, (scene_number, shot_number) in zip(images, shot_keys):
+            image_path = _shot_image_path(scene_number, shot_number)
+            paths.append(_store_image(image, image_path, prompt, writer, len(shot_keys)))
+        missing = shot_keys[len(images):]
+        if missing:
+            print(f"Imagen returned {len(images)} of {len(shot_keys)} images for {label}; retrying the rest individually.")
+        for scene_number, shot_number in missing:
+            paths.append(generate_storyboard_image(
+                None, scene_number, shot_number, None, None, None,
+                model=model, writer=writer, prompt=prompt,
+            ))
+        return paths
+    except Exception as e:
+        print(f"Error generating storyboard images for {label}: {e}")
+        return [None] * len(shot_keys)
+
+
 def generate_storyboard_images(
     storyboard_file,
     narrative_schema_file,
@@ -72,6 +168,9 @@ def generate_storyboard_images(
     shot=None,
     style_profile=None,
     legacy_style=None,
+    concurrency=6,
+    batch_size=4,
+    force=False,
 ):
     try:
         with open(storyboard_file, "r") as f:
@@ -83,32 +182,89 @@ def generate_storyboard_images(
     narrative_schema = {}
     if narrative_schema_file:
         try:
-            with open(narrative_schema_file, "r") as f:
-                narrative_schema = json.load(f)
+            narrative_schema = utils.load_json(narrative_schema_file)
         except FileNotFoundError as e:
             print(f"Error: {e}")
             return
 
     style_profile = utils.resolve_style_profile(style_profile, legacy_style)
+    # Created once here rather than on every save in the worker threads.
+    os.makedirs(os.path.join("output", "visual_assets"), exist_ok=True)
 
-    shots = utils.parse_storyboard_shots(storyboard_content)
-
-    for scene_number, shot_number, shot_description in shots:
-        if scene is not None and int(scene_number) != scene:
-            continue
-        if shot is not None and int(shot_number) != shot:
-            continue
-        generate_storyboard_image(
-            shot_description.strip(),
-            scene_number,
-            shot_number,
-            project,
-            gcp_location,
-            style_profile,
-            narrative_schema,
+    work = [
+        (scene_number, shot_number, shot_description.strip())
+        for scene_number, shot_number, shot_description in utils.iter_storyboard_shots(
+            storyboard_content, scene=scene, shot=shot
         )
+    ]
+    # All prompts are built here, before any request is issued, so workers
+    # only wait on Imagen and never on prompt assembly.
+    # Shots whose full prompt is identical (same description, setting and
+    # style) are requested together via number_of_images, up to batch_size.
+    by_prompt = {}
+    for scene_number, shot_number, description in work:
+        prompt = _build_prompt(description, scene_number, style_profile, narrative_schema)
+        if utils.prompt_cache_hit(
+            _shot_image_path(scene_number, shot_number), prompt, force=force,
+            model=vertex_init.IMAGE_MODEL, aspect_ratio="16:9",
+        ):
+            print(f"cache hit: Scene {scene_number}, Shot {shot_number}")
+            continue
+        by_prompt.setdefault(prompt, []).append((scene_number, shot_number, description))
+    batch_size = max(1, batch_size)
+    # A comma-separated location spreads requests round-robin across regions
+    # to draw on several per-region Imagen quotas.
+    regions = utils.parse_regions(gcp_location) or [gcp_location]
+    models = itertools.cycle(
+        [vertex_init.get_image_model(project, region) for region in regions] if by_prompt else [None]
+    )
 
-    print("\nStoryboard image generation complete.")
+    # Requests are independent, so keep several in flight.  Each task handles
+    # its own errors, so one failed shot does not cancel the rest.  Saves go to
+    # a separate writer pool, which is drained when its block exits.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as writer, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+        futures = []
+        for prompt, group in by_prompt.items():
+            for i in range(0, len(group), batch_size):
+                chunk = group[i:i + batch_size]
+                model = next(models)
+                if len(chunk) == 1:
+                    scene_number, shot_number, description = chunk[0]
+                    futures.append(ex.submit(
+                        generate_storyboard_image,
+                        description,
+                        scene_number,
+                        shot_number,
+                        project,
+                        gcp_location,
+                        style_profile,
+                        narrative_schema,
+                        model,
+                        force,
+                        writer,
+                        prompt,
+                    ))
+                else:
+                    keys = [(sc, sh) for sc, sh, _ in chunk]
+                    futures.append(ex.submit(_generate_storyboard_batch, prompt, keys, model, writer))
+        saves = []
+        failed = 0
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            for item in result if isinstance(result, list) else [result]:
+                if isinstance(item, concurrent.futures.Future):
+                    saves.append(item)
+                elif item is None:
+                    failed += 1
+
+    # The writer pool has drained; a shot whose generation or save failed has
+    # no image, so it must not be reported as done.
+    failed += sum(1 for save in saves if save.exception() is not None)
+    if failed:
+        print(f"\nStoryboard image generation finished with {failed} failed shot(s).")
+    else:
+        print("\nStoryboard image generation complete.")
 
 
 def main():
@@ -122,6 +278,18 @@ def main():
     utils.add_vertex_args(parser)
     utils.add_scene_shot_args(parser)
     utils.add_style_args(parser)
+    utils.add_concurrency_args(parser, default=6)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=4,
+        help="Maximum images per Imagen request for shots with identical prompts.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate images even if one exists for the same prompt.",
+    )
     args = parser.parse_args()
 
     generate_storyboard_images(
@@ -133,6 +301,9 @@ def main():
         shot=args.shot,
         style_profile=args.style_profile,
         legacy_style=args.legacy_style,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        force=args.force,
     )
 
 
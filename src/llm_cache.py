@@ -0,0 +1,64 @@
+"""Disk-backed exact-match cache for Gemini text responses.
+
+Responses are stored under ``output/.llm_cache/<sha256>.txt`` keyed on the
+model name, prompt and generation config, so re-running a step on unchanged
+input returns the previous text instead of calling Gemini again.
+
+The cache is opt-in: set ``CINEFORGE_LLM_CACHE=1`` to enable it.  Sampling
+temperatures above zero make fresh calls non-deterministic, and a cache hit
+deliberately pins the earlier result.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, Optional
+
+CACHE_DIR = os.path.join("output", ".llm_cache")
+
+
+def enabled() -> bool:
+    return os.environ.get("CINEFORGE_LLM_CACHE") == "1"
+
+
+def make_key(model_name: str, prompt: str, gen_cfg: Optional[Dict[str, Any]] = None) -> str:
+    payload = json.dumps({"m": model_name, "p": prompt, "g": gen_cfg or {}}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.txt")
+
+
+def get(key: str) -> Optional[str]:
+    try:
+        with open(_path(key), "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def put(key: str, text: str) -> None:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _path(key)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def cached_generate(
+    model_name: str,
+    prompt: str,
+    gen_cfg: Optional[Dict[str, Any]],
+    generate: Callable[[], str],
+) -> str:
+    """Return the cached response for this request, or call generate() and store it."""
+    if not enabled():
+        return generate()
+    key = make_key(model_name, prompt, gen_cfg)
+    text = get(key)
+    if text is None:
+        text = generate()
+        put(key, text)
+    return text
@@ -1,15 +1,93 @@
 import os
+import concurrent.futures
 import json
-import vertexai
-from vertexai.preview.generative_models import GenerativeModel
+import logging
+import re
+import sys
 import vertexai.preview.generative_models as generative_models
-from vertexai.vision_models import ImageGenerationModel
+try:
+    from . import llm_cache, utils, vertex_init  # type: ignore
+except Exception:
+    sys.path.append(os.path.dirname(__file__))
+    import llm_cache  # type: ignore
+    import utils  # type: ignore
+    import vertex_init  # type: ignore
+
+
+_OUTPUT_DIRS = [
+    os.path.join("output", "narrative_schema"),
+    os.path.join("output", "screenplay"),
+    os.path.join("output", "storyboard_text"),
+    os.path.join("output", "storyboard_images"),
+]
+
+
+def _ensure_output_dirs():
+    """Create every output directory used by this module; called by each entry point."""
+    for d in _OUTPUT_DIRS:
+        os.makedirs(d, exist_ok=True)
+
+
+log = logging.getLogger("cineforge")
+
+# Header such as "SCENE 3, SHOT 2:" at the top of a storyboard block.
+_SHOT_HEADER_RE = re.compile(r"Scene\s+(\d+).*?Shot\s+(\d+)", re.I)
+# A storyboard block: text up to the next blank line.
+_BLOCK_RE = re.compile(r"[^\n][\s\S]*?(?=\n\n|\Z)")
+
+
+# Request settings shared by every Gemini call; built once at import rather
+# than per call.
+_GEMINI_MODEL = "gemini-2.5-pro"
+_GEN_CFG = {
+    "max_output_tokens": 8192,
+    "temperature": 1,
+    "top_p": 0.95,
+}
+_GEN_CFG_SCRIPT = {
+    **_GEN_CFG,
+    # Screenplay and storyboard share one response, so give it the combined
+    # budget the two separate requests used to have.
+    "max_output_tokens": 2 * _GEN_CFG["max_output_tokens"],
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "object",
+        "properties": {
+            "screenplay": {"type": "string"},
+            "storyboard": {"type": "string"},
+        },
+        "required": ["screenplay", "storyboard"],
+    },
+}
+# The dict above is the response-cache key; requests go through
+# GenerationConfig, which converts the lower-case schema types for the API.
+_GEN_CFG_SCRIPT_REQUEST = generative_models.GenerationConfig(**_GEN_CFG_SCRIPT)
+_BLOCK_MEDIUM = generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE
+_SAFETY_SETTINGS = {
+    generative_models.HarmCategory.HARM_CATEGORY_HATE_SPEECH: _BLOCK_MEDIUM,
+    generative_models.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: _BLOCK_MEDIUM,
+    generative_models.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: _BLOCK_MEDIUM,
+    generative_models.HarmCategory.HARM_CATEGORY_HARASSMENT: _BLOCK_MEDIUM,
+}
+
+_CHARACTER_STYLE = "3D cartoon animation, detailed, expressive"
+_CHARACTER_PROMPT = "A full-body character concept art of {name}. Description: {description}. Art style: {style}."
+_ENVIRONMENT_STYLE = "3D cartoon animation, cinematic lighting"
+_ENVIRONMENT_PROMPT = 'An environment concept art plate for "{location}". Art style: {style}.'
+
+
+def _iter_storyboard_blocks(text):
+    """Yield non-blank storyboard blocks lazily instead of splitting into a list."""
+    for m in _BLOCK_RE.finditer(text):
+        block = m.group(0).strip()
+        if block:
+            yield block
 
 
 def deconstruct_narrative(story_file, project, location):
     """Deconstructs a narrative into a structured schema using Gemini."""
-    vertexai.init(project=project, location=location)
-    model = GenerativeModel("gemini-2.5-pro")
+    _ensure_output_dirs()
+    model = vertex_init.get_generative_model(project, location, _GEMINI_MODEL)
 
     with open(story_file, "r") as f:
         story_text = f.read()
@@ -34,221 +112,215 @@ def deconstruct_narrative(story_file, project, location):
     {story_text}
     """
 
-    generation_config = {
-        "max_output_tokens": 8192,
-        "temperature": 1,
-        "top_p": 0.95,
-    }
-
-    safety_settings = {
-        generative_models.HarmCategory.HARM_CATEGORY_HATE_SPEECH: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-        generative_models.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-        generative_models.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-        generative_models.HarmCategory.HARM_CATEGORY_HARASSMENT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-    }
-
-    responses = model.generate_content(
-        [prompt],
-        generation_config=generation_config,
-        safety_settings=safety_settings,
-        stream=True,
+    def _stream():
+        responses = model.generate_content(
+            [prompt],
+            generation_config=_GEN_CFG,
+            safety_settings=_SAFETY_SETTINGS,
+            stream=True,
+        )
+        # Clean up the JSON - Gemini sometimes includes ```json ... ```
+        text = utils.strip_json_fence("".join(response.text for response in responses))
+        # Parse before returning so a truncated or malformed response is
+        # retried and never cached or written as the schema.
+        if not isinstance(json.loads(text), dict):
+            raise ValueError("Narrative schema response is not a JSON object")
+        return text
+
+    schema_json = llm_cache.cached_generate(
+        _GEMINI_MODEL, prompt, _GEN_CFG, lambda: utils.retry_call(_stream)
     )
 
-    schema_json = ""
-    for response in responses:
-        schema_json += response.text
-
-    # Clean up the JSON - Gemini sometimes includes ```json ... ```
-    schema_json = schema_json.strip()
-    if schema_json.startswith("```json"):
-        schema_json = schema_json[7:]
-    if schema_json.endswith("```"):
-        schema_json = schema_json[:-3]
-
     # Save the schema to a file
     output_dir = os.path.join("output", "narrative_schema")
-    os.makedirs(output_dir, exist_ok=True)
     schema_filename = os.path.join(output_dir, f"{os.path.splitext(os.path.basename(story_file))[0]}_schema.json")
-    with open(schema_filename, "w") as f:
-        f.write(schema_json)
+    utils.write_text(schema_filename, schema_json)
 
     return schema_filename
 
 
 def generate_screenplay_and_storyboard(schema_file, project, location):
     """Generates a screenplay and storyboard from a narrative schema using Gemini."""
-    vertexai.init(project=project, location=location)
-    model = GenerativeModel("gemini-2.5-pro")
+    _ensure_output_dirs()
+    model = vertex_init.get_generative_model(project, location, _GEMINI_MODEL)
 
     with open(schema_file, "r") as f:
         schema_text = f.read()
 
-    # Generate Screenplay
-    screenplay_prompt = f"""
-    Based on the following narrative schema, write a detailed screenplay. The screenplay should be formatted correctly, with scene headings, character names, dialogue, and action descriptions.
+    # One structured request returns both documents, so the schema is sent
+    # once and the storyboard no longer waits on a second round trip.
+    prompt = f"""
+    Based on the following narrative schema, write a detailed screenplay and a storyboard for it.
+    The screenplay should be formatted correctly, with scene headings, character names, dialogue, and action descriptions.
+    The storyboard should break down each scene of that screenplay into individual shots, with a description of the camera angle, shot type, and action for each shot.
+    Return both as the "screenplay" and "storyboard" fields of a JSON object.
 
     Narrative Schema:
     {schema_text}
     """
-    screenplay_config = {
-        "max_output_tokens": 8192,
-        "temperature": 1,
-        "top_p": 0.95,
-    }
-    screenplay_responses = model.generate_content(
-        [screenplay_prompt],
-        generation_config=screenplay_config,
-        stream=True,
-    )
-
-    screenplay = ""
-    for response in screenplay_responses:
-        screenplay += response.text
-
-    # Generate Storyboard
-    storyboard_prompt = f"""
-    Based on the following screenplay, create a detailed storyboard. The storyboard should break down each scene into individual shots, with a description of the camera angle, shot type, and action for each shot.
-
-    Screenplay:
-    {screenplay}
-    """
-    storyboard_config = {
-        "max_output_tokens": 8192,
-        "temperature": 1,
-        "top_p": 0.95,
-    }
-    storyboard_responses = model.generate_content(
-        [storyboard_prompt],
-        generation_config=storyboard_config,
-        stream=True,
+    def generate():
+        text = "".join(
+            r.text for r in model.generate_content([prompt], generation_config=_GEN_CFG_SCRIPT_REQUEST, stream=True)
+        )
+        # Validate before returning so a truncated or incomplete response is
+        # retried instead of being cached and failing on every later run; a
+        # reply cut off by the token limit is not valid JSON and lands here.
+        result = json.loads(text)
+        if not (isinstance(result, dict) and result.get("screenplay") and result.get("storyboard")):
+            raise ValueError("Gemini response is missing the screenplay or storyboard")
+        return text
+
+    response = llm_cache.cached_generate(
+        _GEMINI_MODEL, prompt, _GEN_CFG_SCRIPT, lambda: utils.retry_call(generate)
     )
-
-    storyboard = ""
-    for response in storyboard_responses:
-        storyboard += response.text
+    result = json.loads(response)
+    screenplay = result["screenplay"]
+    storyboard = result["storyboard"]
 
     # Save the screenplay and storyboard to files
     project_name = os.path.splitext(os.path.basename(schema_file))[0].replace("_schema", "")
     screenplay_dir = os.path.join("output", "screenplay")
     storyboard_dir = os.path.join("output", "storyboard_text")
-    os.makedirs(screenplay_dir, exist_ok=True)
-    os.makedirs(storyboard_dir, exist_ok=True)
 
     screenplay_filename = os.path.join(screenplay_dir, f"{project_name}_screenplay.txt")
     storyboard_filename = os.path.join(storyboard_dir, f"{project_name}_storyboard.txt")
 
-    with open(screenplay_filename, "w") as f:
-        f.write(screenplay)
-    with open(storyboard_filename, "w") as f:
-        f.write(storyboard)
+    utils.write_text(screenplay_filename, screenplay)
+    utils.write_text(storyboard_filename, storyboard)
 
     return screenplay_filename, storyboard_filename
 
 
 def generate_character_portrait(character_name, character_description, project, location, style_prompt: str | None = None):
     """Generates a character portrait using Imagen."""
-    vertexai.init(project=project, location=location)
-    model = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
-
-    base_style = style_prompt or "3D cartoon animation, detailed, expressive"
-    prompt = (
-        f"A full-body character concept art of {character_name}. "
-        f"Description: {character_description}. "
-        f"Art style: {base_style}."
+    _ensure_output_dirs()
+    prompt = _CHARACTER_PROMPT.format(
+        name=character_name,
+        description=character_description,
+        style=style_prompt or _CHARACTER_STYLE,
     )
 
-    images = model.generate_images(prompt=prompt, number_of_images=1, aspect_ratio="9:16")
-
     image_path = os.path.join("output", "storyboard_images", f"character_{character_name.lower().replace(' ', '_')}.png")
-    os.makedirs(os.path.dirname(image_path), exist_ok=True)
-    images[0].save(location=image_path, include_generation_parameters=True)
+    if utils.prompt_cache_hit(image_path, prompt, model=vertex_init.IMAGE_MODEL, aspect_ratio="9:16"):
+        return image_path
+
+    model = vertex_init.get_image_model(project, location)
+    images = model.generate_images(prompt=prompt, number_of_images=1, aspect_ratio="9:16")
+    utils.save_image(images[0], image_path)
+    utils.record_prompt(image_path, prompt, model=vertex_init.IMAGE_MODEL, aspect_ratio="9:16")
     return image_path
 
 
 def generate_environment_plate(location_name, project, location, style_prompt: str | None = None):
     """Generates an environment plate using Imagen."""
+    _ensure_output_dirs()
     try:
-        vertexai.init(project=project, location=location)
-        model = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
+        prompt = _ENVIRONMENT_PROMPT.format(location=location_name, style=style_prompt or _ENVIRONMENT_STYLE)
 
-        base_style = style_prompt or "3D cartoon animation, cinematic lighting"
-        prompt = (
-            f"An environment concept art plate for \"{location_name}\". "
-            f"Art style: {base_style}."
-        )
+        image_path = os.path.join("output", "storyboard_images", f"environment_{location_name.lower().replace(' ', '_')}.png")
+        if utils.prompt_cache_hit(image_path, prompt, model=vertex_init.IMAGE_MODEL, aspect_ratio="16:9"):
+            return image_path
 
+        model = vertex_init.get_image_model(project, location)
         images = model.generate_images(prompt=prompt, number_of_images=1, aspect_ratio="16:9")
-
-        image_path = os.path.join("output", "storyboard_images", f"environment_{location_name.lower().replace(' ', '_')}.png")
-        os.makedirs(os.path.dirname(image_path), exist_ok=True)
-        images[0].save(location=image_path, include_generation_parameters=True)
+        utils.save_image(images[0], image_path)
+        utils.record_prompt(image_path, prompt, model=vertex_init.IMAGE_MODEL, aspect_ratio="16:9")
         return image_path
     except Exception as e:
-        print(f"Error generating environment plate for {location_name}: {e}")
+        log.error("Error generating environment plate for %s: %s", location_name, e)
         return None
 
 
 def generate_storyboard_image(shot_description, scene_number, shot_number, project, location):
     """Generates a storyboard image from a shot description using Imagen."""
+    _ensure_output_dirs()
     try:
-        vertexai.init(project=project, location=location)
-        model = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
+        image_path = os.path.join("output", "storyboard_images", f"scene_{scene_number}_shot_{shot_number}.png")
+        if utils.prompt_cache_hit(image_path, shot_description, model=vertex_init.IMAGE_MODEL, aspect_ratio="16:9"):
+            return image_path
 
+        model = vertex_init.get_image_model(project, location)
         images = model.generate_images(prompt=shot_description, number_of_images=1, aspect_ratio="16:9")
-
-        image_path = os.path.join("output", "storyboard_images", f"scene_{scene_number}_shot_{shot_number}.png")
-        os.makedirs(os.path.dirname(image_path), exist_ok=True)
-        images[0].save(location=image_path, include_generation_parameters=True)
+        utils.save_image(images[0], image_path)
+        utils.record_prompt(image_path, shot_description, model=vertex_init.IMAGE_MODEL, aspect_ratio="16:9")
         return image_path
     except Exception as e:
-        print(f"Error generating storyboard image for Scene {scene_number}, Shot {shot_number}: {e}")
+        log.error("Error generating storyboard image for Scene %s, Shot %s: %s", scene_number, shot_number, e)
         return None
 
 
-def generate_visual_assets(storyboard_file, schema_file, project, location, style: str | None = None):
+def generate_visual_assets(
+    storyboard_file,
+    schema_file,
+    project,
+    location,
+    style: str | None = None,
+    max_concurrency: int = 8,
+):
     """
     Generates visual assets (character portraits, environment plates, and storyboard images)
     based on the storyboard and narrative schema.
+
+    Assets whose image already exists for the same prompt are skipped, so a
+    rerun after a partial failure only generates what is missing; set
+    CINEFORGE_FORCE=1 to regenerate everything.
+
+    All Imagen requests are independent, so they are issued together on a
+    thread pool capped at ``max_concurrency`` to stay under Vertex rate limits.
     """
+    _ensure_output_dirs()
     with open(storyboard_file, "r") as f:
         storyboard_text = f.read()
-    with open(schema_file, "r") as f:
-        schema = json.load(f)
+    schema = utils.load_json(schema_file)
 
     # Extract character descriptions and locations from the schema
     characters = schema.get("Characters", [])
-    locations = list(set(scene["Setting"] for scene in schema.get("Scene_Breakdown", [])))
-
-    # Style preset
-    style_prompt = None
-    if style:
-        try:
-            with open("config.json", "r") as f:
-                cfg = json.load(f)
-                style_prompt = cfg.get("styles", {}).get(style)
-        except Exception:
-            style_prompt = None
-
-    # Generate character portraits
-    for character in characters:
-        desc = character.get("Description") if isinstance(character, dict) else None
-        name = character.get("Name") if isinstance(character, dict) else None
-        generate_character_portrait(name or str(character), desc or "", project, location, style_prompt=style_prompt)
-
-    # Generate environment plates
-    for location_name in locations:
-        generate_environment_plate(location_name, project, location, style_prompt=style_prompt)
-
-    # Generate storyboard images from storyboard text
-    shots = storyboard_text.strip().split("\n\n")
-    for i, shot in enumerate(shots):
-        scene_number = i // 10 + 1  # Assuming 10 shots per scene for placeholder
-        shot_number = i % 10 + 1
-        # Optionally embed style into shot description
-        shot_prompt = shot
-        if style_prompt:
-            shot_prompt = f"{shot}\n\nStyle: {style_prompt}"
-        generate_storyboard_image(shot_prompt, scene_number, shot_number, project, location)
+    locations = utils.dedupe_by_name(scene.get("Setting") for scene in schema.get("Scene_Breakdown", []))
+
+    # Storyboard blocks are produced lazily below; an empty storyboard yields
+    # none rather than one blank prompt.
+    if not (characters or locations or storyboard_text.strip()):
+        return
+
+    # Style preset, resolved once for every asset below
+    style_prompt = utils.load_styles().get(style) if style else None
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as ex:
+        futures = []
+
+        # Character portraits
+        for character in characters:
+            desc = character.get("Description") if isinstance(character, dict) else None
+            name = character.get("Name") if isinstance(character, dict) else None
+            futures.append(ex.submit(
+                generate_character_portrait, name or str(character), desc or "", project, location, style_prompt=style_prompt
+            ))
+
+        # Environment plates
+        for location_name in locations:
+            futures.append(ex.submit(generate_environment_plate, location_name, project, location, style_prompt=style_prompt))
+
+        # Storyboard images from storyboard text
+        scene_number, shot_number = 1, 0
+        for shot in _iter_storyboard_blocks(storyboard_text):
+            # Take numbering from the block's own header; blocks without one
+            # continue the current scene.
+            m = _SHOT_HEADER_RE.search(shot.split("\n", 1)[0])
+            if m:
+                scene_number, shot_number = int(m.group(1)), int(m.group(2))
+            else:
+                shot_number += 1
+            # Optionally embed style into shot description
+            shot_prompt = shot
+            if style_prompt:
+                shot_prompt = f"{shot}\n\nStyle: {style_prompt}"
+            futures.append(ex.submit(generate_storyboard_image, shot_prompt, scene_number, shot_number, project, location))
+
+        # Let every asset finish even if one fails, then surface the first error.
+        errors = [f.exception() for f in concurrent.futures.as_completed(futures)]
+        errors = [e for e in errors if e is not None]
+    if errors:
+        raise errors[0]
 
 
 def synthesize_video_from_storyboard(storyboard_file, project, location):
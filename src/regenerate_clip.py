@@ -1,13 +1,22 @@
 import argparse
+import logging
 import os
-import vertexai
-from vertexai.preview.vision_models import VideoGenerationModel
+import sys
+try:
+    from . import utils, vertex_init  # type: ignore
+except Exception:
+    # Allow running as a script: python src/regenerate_clip.py
+    sys.path.append(os.path.dirname(__file__))
+    import utils  # type: ignore
+    import vertex_init  # type: ignore
+
+log = logging.getLogger("cineforge")
+
 
 def regenerate_video_clip(shot_description, image_path, scene_number, shot_number, project, location):
     """Generates a video clip from an image and a description using Veo."""
-    print(f"Regenerating video for Scene {scene_number}, Shot {shot_number}...")
-    vertexai.init(project=project, location=location)
-    model = VideoGenerationModel.from_pretrained("veo-3.0-fast-generate-001")
+    log.info("Regenerating video for Scene %s, Shot %s...", scene_number, shot_number)
+    model = vertex_init.get_video_model(project, location)
 
     with open(image_path, "rb") as image_file:
         input_image = image_file.read()
@@ -21,10 +30,9 @@ def regenerate_video_clip(shot_description, image_path, scene_number, shot_numbe
 
     video_path = os.path.join("output", "video_clips", f"scene_{scene_number}_shot_{shot_number}.mp4")
     os.makedirs(os.path.dirname(video_path), exist_ok=True)
-    with open(video_path, "wb") as video_file:
-        video_file.write(videos[0].read())
+    utils.write_stream(videos[0], video_path)
 
-    print(f"Saved regenerated video clip to {video_path}")
+    log.info("Saved regenerated video clip to %s", video_path)
     return video_path
 
 def main():
@@ -36,6 +44,7 @@ def main():
     parser.add_argument("--project", help="Your Google Cloud project ID.", required=True)
     parser.add_argument("--location", help="The Google Cloud location.", default="us-central1")
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
 
     regenerate_video_clip(args.shot_description, args.image_path, args.scene_number, args.shot_number, args.project, args.location)
 
@@ -1,13 +1,21 @@
 import argparse
+import logging
 import os
-import vertexai
-from vertexai.vision_models import ImageGenerationModel
+import sys
+try:
+    from . import vertex_init  # type: ignore
+except Exception:
+    # Allow running as a script: python src/regenerate_shot.py
+    sys.path.append(os.path.dirname(__file__))
+    import vertex_init  # type: ignore
+
+log = logging.getLogger("cineforge")
+
 
 def regenerate_storyboard_image(shot_description, scene_number, shot_number, project, location):
     """Generates a storyboard image from a shot description using Imagen."""
-    print(f"Regenerating image for Scene {scene_number}, Shot {shot_number}...")
-    vertexai.init(project=project, location=location)
-    model = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
+    log.info("Regenerating image for Scene %s, Shot %s...", scene_number, shot_number)
+    model = vertex_init.get_image_model(project, location)
 
     images = model.generate_images(
         prompt=shot_description,
@@ -18,7 +26,7 @@ def regenerate_storyboard_image(shot_description, scene_number, shot_number, pro
     image_path = os.path.join("output", "visual_assets", f"scene_{scene_number}_shot_{shot_number}.png")
     os.makedirs(os.path.dirname(image_path), exist_ok=True)
     images[0].save(location=image_path, include_generation_parameters=True)
-    print(f"Saved regenerated storyboard image to {image_path}")
+    log.info("Saved regenerated storyboard image to %s", image_path)
     return image_path
 
 def main():
@@ -29,6 +37,7 @@ def main():
     parser.add_argument("--project", help="Your Google Cloud project ID.", required=True)
     parser.add_argument("--location", help="The Google Cloud location.", default="us-central1")
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
 
     regenerate_storyboard_image(args.shot_description, args.scene_number, args.shot_number, args.project, args.location)
 
@@ -3,10 +3,10 @@ import json
 import os
 from typing import Any, Dict
 
-import vertexai
-from vertexai.generative_models import GenerativeModel
+from vertexai.generative_models import GenerationConfig
 
 from src.config import load_config, get_path
+from src import llm_cache, utils, vertex_init
 from project_utils import (
     init_project,
     update_step,
@@ -14,6 +14,46 @@ from project_utils import (
 )
 
 
+# OpenAPI-style schema passed as ``response_schema`` so Gemini returns the
+# narrative outline as JSON directly.  It must go through GenerationConfig,
+# which converts these lower-case types into the API's Schema message.
+_NAMED_DESCRIPTION = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "description": {"type": "string"},
+    },
+    "required": ["name", "description"],
+}
+
+NARRATIVE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "logline": {"type": "string"},
+        "summary": {"type": "string"},
+        "plot_points": {"type": "array", "items": {"type": "string"}},
+        "tone": {"type": "string"},
+        "characters": {"type": "array", "items": _NAMED_DESCRIPTION},
+        "locations": {"type": "array", "items": _NAMED_DESCRIPTION},
+        "scenes": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "scene_number": {"type": "integer"},
+                    "setting": {"type": "string"},
+                    "summary": {"type": "string"},
+                    "beats": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["scene_number", "setting", "summary"],
+            },
+        },
+    },
+    "required": ["title", "logline", "summary", "plot_points", "characters", "locations", "scenes"],
+}
+
+
 class NarrativeDeconstructor:
     def __init__(self, config: Dict[str, Any]):
         self.cfg = config
@@ -23,55 +63,46 @@ class NarrativeDeconstructor:
         self.model_name = v.get("models", {}).get("narrative", "gemini-2.5-pro")
         self.gen_cfg = v.get("generation", {}).get("narrative", {"max_output_tokens": 8192, "temperature": 0.2, "top_p": 1.0})
 
-    def _first_pass(self, story_content: str) -> str:
-        vertexai.init(project=self.project, location=self.location)
-        model = GenerativeModel(self.model_name)
+    def _deconstruct(self, story_content: str) -> Dict[str, Any]:
+        """Return the narrative schema in a single structured-output call.
+
+        ``response_schema`` makes Gemini emit JSON matching NARRATIVE_SCHEMA, so
+        there is no separate summary pass and no code fence to strip.
+        """
+        model = vertex_init.get_generative_model(self.project, self.location, self.model_name)
         prompt = f"""
-Analyze the following story and provide a summary, a list of primary characters with brief descriptions, key locations, the overarching plot points, and the story's prevailing tone or genre.
+Analyze the following story and deconstruct it into a hierarchical outline.
+Identify the title, a one-sentence logline, a summary of the story, the overarching plot points, the primary characters, the key locations, and the story's prevailing tone or genre.
+For each character and location, provide a detailed visual description. This should include physical attributes, clothing, typical expressions, and any other details that would help in generating consistent images.
+Break the overall plot into a sequence of distinct scenes, each with its setting, a brief summary, and its constituent beats.
 
 Story:
 {story_content}
 """
-        response = model.generate_content([prompt], generation_config=self.gen_cfg)
-        return response.text
-
-    def _second_pass(self, summary_text: str) -> str:
-        vertexai.init(project=self.project, location=self.location)
-        model = GenerativeModel(self.model_name)
-        prompt = f"""
-Based on the following summary and key elements, generate a hierarchical outline of the story.
-For each character and location, provide a detailed visual description. This should include physical attributes, clothing, typical expressions, and any other details that would help in generating consistent images.
-Break the overall plot into a sequence of distinct scenes, each with a brief summary of its constituent beats.
-The final output must be a consistent, parsable JSON object.
-
-The JSON object should have the following schema:
-{{
-  "title": "The Last Sundown",
-  "logline": "In a desolate future, a lone wanderer must...",
-  "characters": [
-    {{
-      "name": "Elara",
-      "description": "A stoic survivor in her late 20s, with piercing blue eyes, a weathered face, and a scar across her left eyebrow. She wears practical, patched-up clothing suited for the harsh environment: a dusty leather jacket, cargo pants, and sturdy boots. Her expression is typically one of cautious vigilance."
-    }},
-    {{
-      "name": "Kael",
-      "description": "An aging, cynical scavenger in his early 60s, with a grizzled beard, and a perpetual squint from years in the sun. He is often seen in a tattered duster coat and carries a modified energy rifle. His face is etched with the lines of past hardships, but his eyes still hold a spark of cunning."
-    }}
-  ],
-  "locations": [
-    {{
-        "name": "The Dustbowl Outpost",
-        "description": "A ramshackle settlement built from salvaged metal and scrap. The central marketplace is a chaotic maze of stalls, lit by flickering neon signs and powered by a sputtering generator. The air is thick with the smell of ozone and roasted strange meats."
-    }}
-  ],
-  "scenes": []
-}}
-
-Summary and Key Elements:
-{summary_text}
-"""
-        response = model.generate_content([prompt], generation_config=self.gen_cfg)
-        return response.text
+        gen_cfg = {
+            **self.gen_cfg,
+            "response_mime_type": "application/json",
+            "response_schema": NARRATIVE_SCHEMA,
+        }
+        # The plain dict above is the cache key; the request itself needs a
+        # GenerationConfig so the schema is normalised for the API.
+        generation_config = GenerationConfig(**gen_cfg)
+
+        def generate() -> str:
+            text = model.generate_content([prompt], generation_config=generation_config).text
+            # Parse before returning so malformed or truncated JSON is retried
+            # and never stored in the response cache.
+            if not isinstance(json.loads(text), dict):
+                raise ValueError("Narrative schema response is not a JSON object")
+            return text
+
+        text = llm_cache.cached_generate(
+            self.model_name,
+            prompt,
+            gen_cfg,
+            lambda: utils.retry_call(generate),
+        )
+        return json.loads(text)
 
     def run(self, story_path: str, project_name: str | None = None) -> str:
         # Read story content
@@ -83,25 +114,14 @@ Summary and Key Elements:
         update_step(project_name, "narrative_deconstructed", status="running")
 
         try:
-            summary = self._first_pass(story_content)
-            outline = self._second_pass(summary)
-
-            # Normalize fenced code blocks like ```json ... ```
-            outline_str = outline.strip()
-            if outline_str.startswith("```json"):
-                outline_str = outline_str[7:]
-            if outline_str.endswith("```"):
-                outline_str = outline_str[:-3]
-
-            schema = json.loads(outline_str)
+            schema = self._deconstruct(story_content)
 
             # Output path from central config
             out_dir = get_path(self.cfg, "narrative_schema_dir")
             os.makedirs(out_dir, exist_ok=True)
             out_fn = os.path.splitext(os.path.basename(story_path))[0] + "_schema.json"
             out_path = os.path.join(out_dir, out_fn)
-            with open(out_path, "w", encoding="utf-8") as f:
-                json.dump(schema, f, indent=2)
+            utils.save_json(out_path, schema)
 
             update_step(
                 project_name,
@@ -3,10 +3,8 @@ import json
 import os
 from typing import Any, Dict
 
-import vertexai
-from vertexai.generative_models import GenerativeModel
-
 from src.config import load_config, get_path
+from src import llm_cache, utils, vertex_init
 from project_utils import (
     init_project,
     update_step,
@@ -14,6 +12,22 @@ from project_utils import (
 )
 
 
+# Invariant instructions come first and the per-project content last, so
+# every request shares a byte-identical prefix that Gemini's implicit
+# prompt caching can reuse.
+SCREENPLAY_PREFIX = (
+    "Based on the following narrative schema, write a detailed screenplay. "
+    "The screenplay should be formatted correctly, with scene headings, character names, dialogue, and action descriptions.\n\n"
+    "Narrative Schema:\n"
+)
+STORYBOARD_PREFIX = (
+    "Based on the following screenplay, create a detailed storyboard. "
+    "The storyboard should break down each scene into individual shots, with a description of the camera angle, shot type, and action for each shot.\n"
+    "Start each shot with a line of the form 'SCENE <scene number>, SHOT <shot number>:' followed by its description on the next line.\n\n"
+    "Screenplay:\n"
+)
+
+
 class ScreenplayGenerator:
     def __init__(self, config: Dict[str, Any]):
         self.cfg = config
@@ -26,15 +40,18 @@ class ScreenplayGenerator:
         )
 
     def run(self, narrative_schema: Dict[str, Any]) -> str:
-        vertexai.init(project=self.project, location=self.location)
-        model = GenerativeModel(self.model_name)
-        prompt = (
-            "Based on the following narrative schema, write a detailed screenplay. "
-            "The screenplay should be formatted correctly, with scene headings, character names, dialogue, and action descriptions.\n\n"
-            f"Narrative Schema:\n{json.dumps(narrative_schema)}"
-        )
-        response = model.generate_content([prompt], generation_config=self.gen_cfg)
-        return response.text
+        model = vertex_init.get_generative_model(self.project, self.location, self.model_name)
+        prompt = SCREENPLAY_PREFIX + json.dumps(narrative_schema)
+
+        def generate() -> str:
+            text = model.generate_content([prompt], generation_config=self.gen_cfg).text
+            if not text.strip():
+                raise ValueError("Gemini returned an empty screenplay")
+            return text
+
+        # Validation runs inside the retried call, so a bad response is
+        # re-requested here (and never cached) instead of failing in step3/4.
+        return llm_cache.cached_generate(self.model_name, prompt, self.gen_cfg, lambda: utils.retry_call(generate))
 
 
 class StoryboardGenerator:
@@ -49,15 +66,16 @@ class StoryboardGenerator:
         )
 
     def run(self, screenplay_content: str) -> str:
-        vertexai.init(project=self.project, location=self.location)
-        model = GenerativeModel(self.model_name)
-        prompt = (
-            "Based on the following screenplay, create a detailed storyboard. "
-            "The storyboard should break down each scene into individual shots, with a description of the camera angle, shot type, and action for each shot.\n\n"
-            f"Screenplay:\n{screenplay_content}"
-        )
-        response = model.generate_content([prompt], generation_config=self.gen_cfg)
-        return response.text
+        model = vertex_init.get_generative_model(self.project, self.location, self.model_name)
+        prompt = STORYBOARD_PREFIX + screenplay_content
+
+        def generate() -> str:
+            text = model.generate_content([prompt], generation_config=self.gen_cfg).text
+            if not utils.parse_storyboard_shots(text):
+                raise ValueError("Gemini storyboard contained no 'SCENE N, SHOT M:' shots")
+            return text
+
+        return llm_cache.cached_generate(self.model_name, prompt, self.gen_cfg, lambda: utils.retry_call(generate))
 
 
 def main():
@@ -71,8 +89,7 @@ def main():
 
     # Load schema
     try:
-        with open(args.schema_file, "r", encoding="utf-8") as f:
-            narrative_schema = json.load(f)
+        narrative_schema = utils.load_json(args.schema_file)
     except FileNotFoundError:
         print(f"Error: Schema file not found at {args.schema_file}")
         return
@@ -89,8 +106,7 @@ def main():
         os.makedirs(screenplay_dir, exist_ok=True)
         screenplay_filename = os.path.splitext(os.path.basename(args.schema_file))[0].replace("_schema", "") + "_screenplay.txt"
         screenplay_output_path = os.path.join(screenplay_dir, screenplay_filename)
-        with open(screenplay_output_path, "w", encoding="utf-8") as f:
-            f.write(screenplay_content)
+        utils.write_text(screenplay_output_path, screenplay_content)
         update_step(
             project_name,
             "screenplay_generated",
@@ -111,8 +127,7 @@ def main():
         os.makedirs(storyboard_dir, exist_ok=True)
         storyboard_filename = os.path.splitext(os.path.basename(args.schema_file))[0].replace("_schema", "") + "_storyboard.txt"
         storyboard_output_path = os.path.join(storyboard_dir, storyboard_filename)
-        with open(storyboard_output_path, "w", encoding="utf-8") as f:
-            f.write(storyboard_content)
+        utils.write_text(storyboard_output_path, storyboard_content)
         update_step(
             project_name,
             "storyboard_generated",
@@ -1,15 +1,18 @@
 import argparse
-import json
 import os
-import re
-import vertexai
-from vertexai.vision_models import ImageGenerationModel
+import sys
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from . import utils, vertex_init  # type: ignore
+except Exception:
+    sys.path.append(os.path.dirname(__file__))
+    import utils  # type: ignore
+    import vertex_init  # type: ignore
 
 def generate_character_portrait(character_name, character_description, project, location):
     """Generates a character portrait using Imagen."""
     print(f"Generating portrait for {character_name}...")
-    vertexai.init(project=project, location=location)
-    model = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
+    model = vertex_init.get_image_model(project, location)
 
     prompt = (
         f"A full-body character concept art of {character_name}. "
@@ -24,8 +27,7 @@ def generate_character_portrait(character_name, character_description, project,
     )
 
     image_path = os.path.join("output", "storyboard_images", f"character_{character_name.lower().replace(' ', '_')}.png")
-    os.makedirs(os.path.dirname(image_path), exist_ok=True)
-    images[0].save(location=image_path, include_generation_parameters=True)
+    utils.save_image(images[0], image_path)
     print(f"Saved character portrait to {image_path}")
     return image_path
 
@@ -33,8 +35,7 @@ def generate_environment_plate(location_name, project, location):
     """Generates an environment plate using Imagen."""
     print(f"Generating environment plate for {location_name}...")
     try:
-        vertexai.init(project=project, location=location)
-        model = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
+        model = vertex_init.get_image_model(project, location)
 
         prompt = (
             f"An environment concept art plate for \"{location_name}\". "
@@ -48,8 +49,7 @@ def generate_environment_plate(location_name, project, location):
         )
 
         image_path = os.path.join("output", "storyboard_images", f"environment_{location_name.lower().replace(' ', '_')}.png")
-        os.makedirs(os.path.dirname(image_path), exist_ok=True)
-        images[0].save(location=image_path, include_generation_parameters=True)
+        utils.save_image(images[0], image_path)
         print(f"Saved environment plate to {image_path}")
         return image_path
     except Exception as e:
@@ -60,8 +60,7 @@ def generate_storyboard_image(shot_description, scene_number, shot_number, proje
     """Generates a storyboard image from a shot description using Imagen."""
     print(f"Generating image for Scene {scene_number}, Shot {shot_number}...")
     try:
-        vertexai.init(project=project, location=location)
-        model = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
+        model = vertex_init.get_image_model(project, location)
 
         images = model.generate_images(
             prompt=shot_description,
@@ -70,8 +69,7 @@ def generate_storyboard_image(shot_description, scene_number, shot_number, proje
         )
 
         image_path = os.path.join("output", "storyboard_images", f"scene_{scene_number}_shot_{shot_number}.png")
-        os.makedirs(os.path.dirname(image_path), exist_ok=True)
-        images[0].save(location=image_path, include_generation_parameters=True)
+        utils.save_image(images[0], image_path)
         print(f"Saved storyboard image to {image_path}")
         return image_path
     except Exception as e:
@@ -84,33 +82,49 @@ def main():
     parser.add_argument("schema_file", help="The path to the narrative schema JSON file.")
     parser.add_argument("--project", help="Your Google Cloud project ID.", required=True)
     parser.add_argument("--location", help="The Google Cloud location.", default="us-central1")
+    utils.add_concurrency_args(parser)
     args = parser.parse_args()
 
     try:
-        with open(args.storyboard_file, "r") as f:
-            storyboard_content = f.read()
-        with open(args.schema_file, "r") as f:
-            narrative_schema = json.load(f)
+        shots = utils.load_storyboard_shots(args.storyboard_file)
+        narrative_schema = utils.load_json(args.schema_file)
     except FileNotFoundError as e:
         print(f"Error: {e}")
         return
 
-    # Generate character portraits
-    characters = narrative_schema.get("characters", [])
-    for character in characters:
-        generate_character_portrait(character.get("name"), character.get("description"), args.project, args.location)
-
-    # Generate environment plates
-    locations = list(set(scene.get("setting") for scene in narrative_schema.get("scenes", [])))
-    for location in locations:
-        generate_environment_plate(location, args.project, args.location)
-
-    # Generate storyboard images
-    shot_regex = re.compile(r"SCENE (\d+), SHOT (\d+):\n(.*?)(?=\nSCENE|\Z)", re.DOTALL)
-    shots = shot_regex.findall(storyboard_content)
-
-    for scene_number, shot_number, shot_description in shots:
-        generate_storyboard_image(shot_description.strip(), scene_number, shot_number, args.project, args.location)
+    # Created once here rather than on every save in the worker threads.
+    os.makedirs(os.path.join("output", "storyboard_images"), exist_ok=True)
+
+    # Key assets by normalized name so "The Docks" and "the  docks " (or a
+    # character listed twice) cost one Imagen call; the first spelling wins.
+    characters = {}
+    for c in narrative_schema.get("characters", []):
+        name = c.get("name")
+        if name:
+            characters.setdefault(utils.normalize_asset_key(name), (name, c.get("description")))
+    locations = utils.dedupe_by_name(s.get("setting") for s in narrative_schema.get("scenes", []))
+
+    jobs = [("char", args_) for args_ in characters.values()]
+    jobs += [("env", (location,)) for location in locations]
+    jobs += [
+        ("shot", (desc, scene_number, shot_number))
+        for scene_number, shot_number, desc in shots
+    ]
+
+    generators = {
+        "char": generate_character_portrait,
+        "env": generate_environment_plate,
+        "shot": generate_storyboard_image,
+    }
+
+    def dispatch(job):
+        kind, job_args = job
+        return generators[kind](*job_args, args.project, args.location)
+
+    # Every asset is an independent Imagen request, so run them on one pool
+    # sharing the cached model handle instead of one after another.
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as ex:
+        list(ex.map(dispatch, jobs))
 
     print("\nVisual asset generation complete.")
 
@@ -1,16 +1,103 @@
 import argparse
 import os
-import re
+import shutil
+import subprocess
+import sys
+import tempfile
 import ffmpeg
-import vertexai
-from vertexai.preview.vision_models import VideoGenerationModel
 from collections import defaultdict
-
-def generate_video_clip(shot_description, image_path, scene_number, shot_number, project, location):
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+try:
+    from . import step3_visual_asset_generation, utils, vertex_init  # type: ignore
+except Exception:
+    # Allow running as a script: python src/step4_video_synthesis.py
+    sys.path.append(os.path.dirname(__file__))
+    import step3_visual_asset_generation  # type: ignore
+    import utils  # type: ignore
+    import vertex_init  # type: ignore
+
+# Shot clips only live until they are concatenated.  They go to the normal
+# temp dir by default; point CINEFORGE_SCRATCH_DIR at a tmpfs (e.g. /dev/shm)
+# to keep them off the disk, but size it for several clips per scene first:
+# Docker's default /dev/shm is only 64 MB.
+_SCRATCH_ROOT = os.environ.get("CINEFORGE_SCRATCH_DIR") or None
+
+# Hardware H.264 encoders in order of preference, with the preset each one
+# takes.  VAAPI is left out because it needs an explicit device and upload
+# filter; set CINEFORGE_VIDEO_ENCODER to force any encoder ffmpeg knows.
+_HW_H264_ENCODERS = (
+    ("h264_nvenc", {"preset": "p4"}),
+    ("h264_qsv", {"preset": "veryfast"}),
+    ("h264_videotoolbox", {}),
+)
+_SOFTWARE_ENCODER = ("libx264", {"preset": "veryfast", "threads": 0})
+
+@lru_cache(maxsize=None)
+def _pick_h264_encoder():
+    """Return (encoder, options) for the re-encode fallback, probing ffmpeg once."""
+    override = os.environ.get("CINEFORGE_VIDEO_ENCODER")
+    if override:
+        known = dict((_SOFTWARE_ENCODER,) + _HW_H264_ENCODERS)
+        return override, known.get(override, {})
+    try:
+        listing = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return _SOFTWARE_ENCODER
+    available = {line.split()[1] for line in listing.splitlines() if len(line.split()) > 1}
+    for name, opts in _HW_H264_ENCODERS:
+        if name in available:
+            return name, opts
+    return _SOFTWARE_ENCODER
+
+def _stream_signature(path):
+    """Video codec parameters of a clip, or None if it has no video stream."""
+    stream = next((s for s in ffmpeg.probe(path)["streams"] if s.get("codec_type") == "video"), None)
+    if stream is None:
+        return None
+    return stream.get("codec_name"), stream.get("profile"), stream.get("width"), stream.get("height")
+
+def _concat_clips(concat_file_path, clip_paths, output_path):
+    """Concatenate clips, stream-copying when they share codec parameters.
+
+    Clips that differ cannot be joined with -c copy, so they are re-encoded,
+    on a hardware H.264 encoder when ffmpeg has one and libx264 otherwise.
+    """
+    stream = ffmpeg.input(concat_file_path, format='concat', safe=0)
+
+    def run(**kwargs):
+        stream.output(output_path, **kwargs).global_args('-loglevel', 'error').run(overwrite_output=True)
+
+    # A clip without a video stream (None) never counts as matching.
+    signatures = {_stream_signature(p) for p in clip_paths}
+    if None not in signatures and len(signatures) <= 1:
+        run(c='copy')
+        return
+    encoder, opts = _pick_h264_encoder()
+    try:
+        run(vcodec=encoder, acodec='aac', **opts)
+    except ffmpeg.Error:
+        # An encoder can be compiled in without a usable device behind it.
+        if encoder == _SOFTWARE_ENCODER[0]:
+            raise
+        software, software_opts = _SOFTWARE_ENCODER
+        run(vcodec=software, acodec='aac', **software_opts)
+
+def _keep_clips(scratch_dir):
+    """Move finished shot clips out of a scene's scratch dir into output/video_clips."""
+    kept_dir = os.path.join("output", "video_clips")
+    with os.scandir(scratch_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".mp4") and entry.is_file():
+                shutil.move(entry.path, os.path.join(kept_dir, entry.name))
+                print(f"Kept finished clip {entry.name} in {kept_dir}")
+
+def generate_video_clip(shot_description, image_path, scene_number, shot_number, project, location, output_dir=None):
     """Generates a video clip from an image and a description using Veo."""
     print(f"Generating video for Scene {scene_number}, Shot {shot_number}...")
-    vertexai.init(project=project, location=location)
-    model = VideoGenerationModel.from_pretrained("veo-3.0-fast-generate-001")
+    model = vertex_init.get_video_model(project, location)
 
     with open(image_path, "rb") as image_file:
         input_image = image_file.read()
@@ -22,13 +109,25 @@ def generate_video_clip(shot_description, image_path, scene_number, shot_number,
         aspect_ratio="16:9"
     )
 
-    video_path = os.path.join("output", "video_clips", f"scene_{scene_number}_shot_{shot_number}.mp4")
-    with open(video_path, "wb") as video_file:
-        video_file.write(videos[0].read())
+    video_path = os.path.join(output_dir or os.path.join("output", "video_clips"), f"scene_{scene_number}_shot_{shot_number}.mp4")
+    utils.write_stream(videos[0], video_path)
 
     print(f"Saved video clip to {video_path}")
     return video_path
 
+def _image_then_clip(shot_description, scene_number, shot_number, project, location, output_dir=None):
+    """Generate the shot's storyboard image, then its clip, in one worker.
+
+    Chaining the two per shot lets Veo start on each shot as soon as its
+    image lands instead of waiting for every image in the storyboard.
+    """
+    image_path = step3_visual_asset_generation.generate_storyboard_image(
+        shot_description, scene_number, shot_number, project, location
+    )
+    if not image_path:
+        return None
+    return generate_video_clip(shot_description, image_path, scene_number, shot_number, project, location, output_dir)
+
 def main():
     parser = argparse.ArgumentParser(description="Generate video clips from storyboard images.")
     parser.add_argument("storyboard_file", help="The path to the text-based storyboard file.")
@@ -36,55 +135,77 @@ def main():
     parser.add_argument("--project", help="Your Google Cloud project ID.", required=True)
     parser.add_argument("--location", help="The Google Cloud location.", default="us-central1")
     parser.add_argument("--scene", help="The scene number to generate videos for.", type=int)
+    parser.add_argument(
+        "--generate-missing-images",
+        action="store_true",
+        help="Generate a shot's storyboard image when it is missing, overlapping image and video generation.",
+    )
+    utils.add_concurrency_args(parser, default=4)
     args = parser.parse_args()
 
     try:
-        with open(args.storyboard_file, "r") as f:
-            storyboard_content = f.read()
+        shots = utils.load_storyboard_shots(args.storyboard_file)
     except FileNotFoundError:
         print(f"Error: Storyboard file not found at {args.storyboard_file}")
         return
 
-    shot_regex = re.compile(r"SCENE (\d+), SHOT (\d+):\n(.*?)(?=\nSCENE|\Z)", re.DOTALL)
-    shots = shot_regex.findall(storyboard_content)
-
     shots_by_scene = defaultdict(list)
     for scene_number, shot_number, shot_description in shots:
-        shots_by_scene[int(scene_number)].append((shot_number, shot_description))
-
-    for scene_number, scene_shots in shots_by_scene.items():
-        if args.scene is not None and scene_number != args.scene:
-            continue
-
-        generated_shot_paths = []
-        for shot_number, shot_description in scene_shots:
-            image_name = f"scene_{scene_number}_shot_{shot_number}.png"
-            image_path = os.path.join(args.images_directory, image_name)
-
-            if os.path.exists(image_path):
-                video_path = generate_video_clip(shot_description.strip(), image_path, scene_number, shot_number, args.project, args.location)
-                generated_shot_paths.append(video_path)
-            else:
-                print(f"Warning: Image not found for Scene {scene_number}, Shot {shot_number} at {image_path}")
-
-        if generated_shot_paths:
-            scene_video_path = os.path.join("output", "video_clips", f"scene_{scene_number}.mp4")
-            
-            # Create a temporary file with the list of video files for concatenation
-            concat_file_path = os.path.join("output", "video_clips", f"concat_scene_{scene_number}.txt")
-            with open(concat_file_path, "w") as f:
-                for path in generated_shot_paths:
-                    f.write(f"file '{os.path.basename(path)}'\n")
-            
-            (ffmpeg.input(concat_file_path, format='concat', safe=0)
-             .output(scene_video_path, c='copy').run(overwrite_output=True))
-
-            print(f"Concatenated shots into {scene_video_path}")
-
-            # Clean up individual shot videos and concat file
-            for path in generated_shot_paths:
-                os.remove(path)
-            os.remove(concat_file_path)
+        if args.scene is None or int(scene_number) == args.scene:
+            shots_by_scene[int(scene_number)].append((shot_number, shot_description))
+
+    os.makedirs(os.path.join("output", "video_clips"), exist_ok=True)
+
+    # Veo latency dominates each shot, so a scene's clips are generated
+    # concurrently and only the ffmpeg concat waits for all of them.
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as ex:
+        for scene_number, scene_shots in shots_by_scene.items():
+            scratch_dir = tempfile.mkdtemp(prefix=f"cineforge_scene_{scene_number}_", dir=_SCRATCH_ROOT)
+            try:
+                futures = []
+                for shot_number, shot_description in scene_shots:
+                    image_name = f"scene_{scene_number}_shot_{shot_number}.png"
+                    image_path = os.path.join(args.images_directory, image_name)
+
+                    if os.path.exists(image_path):
+                        futures.append(ex.submit(
+                            generate_video_clip, shot_description, image_path, scene_number, shot_number,
+                            args.project, args.location, scratch_dir,
+                        ))
+                    elif args.generate_missing_images:
+                        futures.append(ex.submit(
+                            _image_then_clip, shot_description, scene_number, shot_number,
+                            args.project, args.location, scratch_dir,
+                        ))
+                    else:
+                        print(f"Warning: Image not found for Scene {scene_number}, Shot {shot_number} at {image_path}")
+
+                # Let every shot finish before surfacing a failure, so clips that
+                # are still rendering are not abandoned.
+                wait(futures)
+                # Collect in submission order so the concat list keeps shot order.
+                generated_shot_paths = [path for path in (f.result() for f in futures) if path]
+
+                if generated_shot_paths:
+                    scene_video_path = os.path.join("output", "video_clips", f"scene_{scene_number}.mp4")
+
+                    # Create a temporary file with the list of video files for concatenation
+                    concat_file_path = os.path.join(scratch_dir, "concat.txt")
+                    with open(concat_file_path, "w") as f:
+                        for path in generated_shot_paths:
+                            f.write(f"file '{os.path.basename(path)}'\n")
+
+                    _concat_clips(concat_file_path, generated_shot_paths, scene_video_path)
+
+                    print(f"Concatenated shots into {scene_video_path}")
+            except BaseException:
+                # Finished clips are paid for; keep them rather than deleting
+                # them with the scratch dir when one shot or the concat fails.
+                _keep_clips(scratch_dir)
+                raise
+            finally:
+                # Individual shot videos and the concat list go with the scratch dir.
+                shutil.rmtree(scratch_dir, ignore_errors=True)
 
     print("\nVideo synthesis complete.")
 
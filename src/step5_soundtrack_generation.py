@@ -1,17 +1,25 @@
 
 import argparse
-import json
 import os
-import vertexai
-from vertexai.preview.generative_models import GenerativeModel, Part
+import sys
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from . import utils, vertex_init  # type: ignore
+except Exception:
+    # Allow running as a script: python src/step5_soundtrack_generation.py
+    sys.path.append(os.path.dirname(__file__))
+    import utils  # type: ignore
+    import vertex_init  # type: ignore
 
-def generate_soundtrack(project_id: str, location: str, narrative_schema_path: str, output_dir: str):
-    """Generates a soundtrack for each scene using Vertex AI."""
-    vertexai.init(project=project_id, location=location)
+def generate_soundtrack(project_id: str, location: str, narrative_schema_path: str, output_dir: str, concurrency: int = 4):
+    """Generates a soundtrack for each scene using Vertex AI.
 
+    Scenes are independent requests, so they run on a thread pool of
+    ``concurrency`` workers; each request is retried with backoff so a
+    transient 429 does not drop a scene.
+    """
     # Load the narrative schema
-    with open(narrative_schema_path, "r") as f:
-        schema = json.load(f)
+    schema = utils.load_json(narrative_schema_path)
 
     logline = schema.get("logline", "")
     scenes = schema.get("scenes", [])
@@ -21,30 +29,37 @@ def generate_soundtrack(project_id: str, location: str, narrative_schema_path: s
         return
 
     os.makedirs(output_dir, exist_ok=True)
-    model = GenerativeModel("music-generation-preview")
+    model = vertex_init.get_generative_model(project_id, location, "music-generation-preview")
 
-    for i, scene in enumerate(scenes):
+    def generate_scene(i, scene):
         scene_summary = scene.get("summary", "")
         mood = scene.get("mood", "")
         prompt = f"Generate a music soundtrack for a scene with the following mood: {mood}. The overall story theme is: '{logline}' The scene summary is: '{scene_summary}'"
 
         print(f"Using prompt for scene {i+1}: {prompt}")
 
-        response = model.generate_content([prompt])
+        response = utils.retry_call(model.generate_content, [prompt])
         music_part = response.candidates[0].content.parts[0]
 
         output_path = os.path.join(output_dir, f"scene_{i+1:03d}_soundtrack.mp3")
-        with open(output_path, "wb") as f:
+        tmp_path = output_path + ".tmp"
+        with open(tmp_path, "wb") as f:
             f.write(music_part.blob)
+        os.replace(tmp_path, output_path)
 
         print(f"Soundtrack for scene {i+1} saved to {output_path}")
 
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+        # list() surfaces the first failure once every scene has been tried.
+        list(ex.map(generate_scene, range(len(scenes)), scenes))
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate a soundtrack for each scene in a story.")
     parser.add_argument("narrative_schema_path", help="Path to the narrative schema JSON file.")
     parser.add_argument("--project", required=True, help="Google Cloud project ID.")
     parser.add_argument("--location", default="us-central1", help="Google Cloud location.")
     parser.add_argument("--output_dir", default="output/soundtracks", help="Directory to save the generated soundtracks.")
+    utils.add_concurrency_args(parser, default=4)
     args = parser.parse_args()
 
-    generate_soundtrack(args.project, args.location, args.narrative_schema_path, args.output_dir)
+    generate_soundtrack(args.project, args.location, args.narrative_schema_path, args.output_dir, args.concurrency)
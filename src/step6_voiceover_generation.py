@@ -1,38 +1,85 @@
 import argparse
 import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from google.cloud import texttospeech
+try:
+    from . import utils  # type: ignore
+except Exception:
+    # Allow running as a script: python src/step6_voiceover_generation.py
+    sys.path.append(os.path.dirname(__file__))
+    import utils  # type: ignore
 
-def generate_voiceover(project_id: str, screenplay_path: str, output_path: str):
-    """Generates a voiceover from a screenplay using Google Cloud Text-to-Speech."""
+# Text-to-Speech rejects inputs over 5000 bytes; stay under it with margin.
+_TTS_BYTE_LIMIT = 4500
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
 
-    # Initialize the Text-to-Speech client
-    client = texttospeech.TextToSpeechClient()
+@lru_cache(maxsize=1)
+def _client():
+    """One Text-to-Speech client per process; it is safe to share across threads."""
+    return texttospeech.TextToSpeechClient()
 
-    # Read the screenplay
+def _split_oversized(piece, limit):
+    """Yield parts of piece that each fit in limit UTF-8 bytes, breaking on whitespace when possible."""
+    while len(piece.encode("utf-8")) > limit:
+        # Longest prefix within the byte budget, never cutting a character.
+        cut = len(piece.encode("utf-8")[:limit].decode("utf-8", "ignore"))
+        space = piece.rfind(" ", 0, cut + 1)
+        if space > 0:
+            cut = space
+        yield piece[:cut].rstrip()
+        piece = piece[cut:].lstrip()
+    if piece:
+        yield piece
+
+def _chunk(text, limit=_TTS_BYTE_LIMIT):
+    """Greedily pack whole sentences into chunks of at most limit UTF-8 bytes.
+
+    A sentence longer than limit on its own (e.g. unpunctuated dialogue) is
+    first hard-split, on whitespace where possible.
+    """
+    chunks, current, size = [], [], 0
+    for sentence in _SENTENCE_END_RE.split(text):
+        for piece in _split_oversized(sentence, limit):
+            n = len(piece.encode("utf-8"))
+            if current and size + 1 + n > limit:
+                chunks.append(" ".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += n + (1 if size else 0)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+def _iter_dialogue(lines):
+    """Yield the stripped dialogue lines of a screenplay (simple extraction logic)."""
+    for line in lines:
+        line = line.strip()
+        # All-caps lines (character cues, SCENE/INT./EXT. headings) and
+        # parentheticals are skipped; mixed-case lines are always spoken.
+        if line and not line.isupper() and not line.startswith("("):
+            yield line
+
+def generate_voiceover(project_id: str, screenplay_path: str, output_path: str, concurrency: int = 4):
+    """Generates a voiceover from a screenplay using Google Cloud Text-to-Speech.
+
+    Dialogue longer than one request allows is split on sentence boundaries;
+    the chunks are synthesized in parallel and their MP3 bytes joined in order.
+    """
+
+    # Reuse the process-wide client so repeat calls skip channel and auth setup
+    client = _client()
+
+    # Stream the screenplay line by line rather than reading it whole
     with open(screenplay_path, "r") as f:
-        screenplay = f.read()
-
-    # Extract dialogue from the screenplay (simple extraction logic)
-    dialogue_lines = []
-    for line in screenplay.split('
-'):
-        if line.isupper() and not line.startswith('SCENE') and not line.startswith('INT.') and not line.startswith('EXT.'):
-            # This is likely a character name
-            pass
-        elif line.startswith('('):
-            # This is likely a parenthetical
-            pass
-        elif line.strip() and not line.isupper():
-            dialogue_lines.append(line.strip())
-
-    dialogue = " ".join(dialogue_lines)
+        dialogue = " ".join(_iter_dialogue(f))
 
     if not dialogue:
         print("No dialogue found in the screenplay.")
         return
 
-    synthesis_input = texttospeech.SynthesisInput(text=dialogue)
-
     # Build the voice request
     voice = texttospeech.VoiceSelectionParams(
         language_code="en-US", ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL
@@ -43,15 +90,24 @@ def generate_voiceover(project_id: str, screenplay_path: str, output_path: str):
         audio_encoding=texttospeech.AudioEncoding.MP3
     )
 
-    # Perform the text-to-speech request
-    response = client.synthesize_speech(
-        input=synthesis_input, voice=voice, audio_config=audio_config
-    )
+    def synthesize(text):
+        # Retried with backoff so a quota (429) error does not lose a chunk.
+        response = utils.retry_call(
+            client.synthesize_speech,
+            input=texttospeech.SynthesisInput(text=text), voice=voice, audio_config=audio_config,
+        )
+        return response.audio_content
+
+    # Perform the text-to-speech requests; map keeps chunk order.
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+        audio = b"".join(ex.map(synthesize, _chunk(dialogue)))
 
     # Save the audio to the output file
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "wb") as f:
-        f.write(response.audio_content)
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(audio)
+    os.replace(tmp_path, output_path)
 
     print(f"Voiceover saved to {output_path}")
 
@@ -60,6 +116,7 @@ if __name__ == "__main__":
     parser.add_argument("screenplay_path", help="Path to the screenplay file.")
     parser.add_argument("--project", required=True, help="Google Cloud project ID.")
     parser.add_argument("--output_path", default="output/voiceover/voiceover.mp3", help="Path to save the generated voiceover.")
+    utils.add_concurrency_args(parser, default=4)
     args = parser.parse_args()
 
-    generate_voiceover(args.project, args.screenplay_path, args.output_path)
\ No newline at end of file
+    generate_voiceover(args.project, args.screenplay_path, args.output_path, args.concurrency)
\ No newline at end of file
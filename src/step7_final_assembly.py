@@ -3,6 +3,77 @@ import argparse
 import os
 import ffmpeg
 import re
+from concurrent.futures import ThreadPoolExecutor
+
+# Scene videos produced by step4; shot clips (scene_N_shot_M.mp4) are ignored.
+_SCENE_VIDEO_RE = re.compile(r"scene_(\d+)\.mp4$")
+_SHOT_CLIP_RE = re.compile(r"scene_\d+_shot_\d+\.mp4$")
+_DIALOGUE_RE = re.compile(r"scene_(\d+)_dialogue_\d{3}\.mp3$")
+
+def _scan_videos(video_clips_dir):
+    # Order scenes numerically (scene_10 after scene_9) and take the scene
+    # number from the file name rather than its position in the listing.
+    # Returns the scene videos and any other .mp4 files that were left out.
+    scenes, skipped = [], []
+    with os.scandir(video_clips_dir) as it:
+        for e in it:
+            if not e.is_file():
+                continue
+            if m := _SCENE_VIDEO_RE.match(e.name):
+                scenes.append((int(m.group(1)), e.name))
+            elif e.name.endswith(".mp4") and not _SHOT_CLIP_RE.match(e.name):
+                skipped.append(e.name)
+    return sorted(scenes), sorted(skipped)
+
+def _scan_dialogue(dialogue_dir):
+    dialogue_by_scene = {}
+    with os.scandir(dialogue_dir) as it:
+        for e in sorted(it, key=lambda e: e.name):
+            m = _DIALOGUE_RE.match(e.name)
+            if m and e.is_file():
+                dialogue_by_scene.setdefault(int(m.group(1)), []).append(e.path)
+    return dialogue_by_scene
+
+def _scan_soundtracks(soundtrack_dir):
+    # One directory read instead of an exists() probe per scene.
+    with os.scandir(soundtrack_dir) as it:
+        return {e.name for e in it if e.name.endswith(".mp3")}
+
+def _soundtrack_name(scene_num):
+    return f"scene_{scene_num:03d}_soundtrack.mp3"
+
+def _probe_duration(path):
+    return float(ffmpeg.probe(path)["format"]["duration"])
+
+def _scene_audio(duration, dialogue_files, soundtrack_path):
+    """Build the audio track for one scene, padded or trimmed to its video length."""
+    if dialogue_files:
+        dialogue = ffmpeg.concat(*(ffmpeg.input(f).audio for f in dialogue_files), v=0, a=1)
+    else:
+        dialogue = None
+    soundtrack = ffmpeg.input(soundtrack_path).audio if soundtrack_path else None
+
+    if dialogue is not None and soundtrack is not None:
+        # With audio ducking
+        audio = ffmpeg.filter(
+            [soundtrack.filter('volume', 0.3), dialogue.filter('volume', 1.0)],
+            'amix', inputs=2, duration='first',
+        )
+    elif dialogue is not None:
+        audio = dialogue
+    elif soundtrack is not None:
+        audio = soundtrack
+    else:
+        audio = ffmpeg.input('anullsrc=r=48000:cl=stereo', f='lavfi').audio
+
+    # The concat filter needs matching formats, and each segment must be
+    # exactly as long as its scene so audio stays in sync with the video.
+    return (
+        audio.filter('aformat', sample_rates=48000, channel_layouts='stereo')
+        .filter('apad')
+        .filter('atrim', duration=duration)
+        .filter('asetpts', 'N/SR/TB')
+    )
 
 def assemble_film(
     video_clips_dir: str,
@@ -11,80 +82,76 @@ def assemble_film(
     output_dir: str,
     output_filename: str
 ):
-    """Assembles the final film from video clips, dialogue, and soundtracks."""
+    """Assembles the final film from video clips, dialogue, and soundtracks.
 
-    video_files = sorted([f for f in os.listdir(video_clips_dir) if f.endswith(".mp4")])
-    all_dialogue_files = sorted([f for f in os.listdir(dialogue_dir) if f.endswith(".mp3")])
-    soundtrack_files = sorted([f for f in os.listdir(soundtrack_dir) if f.endswith(".mp3")])
+    Everything runs as one ffmpeg invocation: scene videos are stream-copied
+    through the concat demuxer while a single filter graph mixes and joins
+    each scene's dialogue and soundtrack, so no per-scene intermediate files
+    are written.
+    """
 
+    video_files, skipped_videos = _scan_videos(video_clips_dir)
+    dialogue_by_scene = _scan_dialogue(dialogue_dir)
+    soundtracks = _scan_soundtracks(soundtrack_dir)
+
+    if skipped_videos:
+        print(f"Skipping video files not named scene_N.mp4: {', '.join(skipped_videos)}")
     if not video_files:
+        if skipped_videos:
+            raise ValueError(f"No scene_N.mp4 videos found in {video_clips_dir}")
         print("No video clips found.")
         return
 
-    processed_scene_files = []
-    temp_dir = os.path.join(output_dir, "temp_scenes")
-    os.makedirs(temp_dir, exist_ok=True)
-
-    for i, video_file in enumerate(video_files):
-        scene_num = i + 1
-        video_path = os.path.join(video_clips_dir, video_file)
-        video_input = ffmpeg.input(video_path)
-
-        # Filter dialogue files for the current scene
-        scene_dialogue_files = [f for f in all_dialogue_files if re.match(f'scene_{scene_num}_dialogue_\d{{3}}\.mp3', f)]
-        
-        if scene_dialogue_files:
-            dialogue_inputs = [ffmpeg.input(os.path.join(dialogue_dir, f)) for f in scene_dialogue_files]
-            concatenated_dialogue = ffmpeg.concat(*dialogue_inputs, v=0, a=1)
-        else:
-            concatenated_dialogue = None
+    os.makedirs(output_dir, exist_ok=True)
+    final_output_path = os.path.join(output_dir, output_filename)
+    has_audio = any(
+        dialogue_by_scene.get(scene_num) or _soundtrack_name(scene_num) in soundtracks
+        for scene_num, _ in video_files
+    )
+    if not has_audio and len(video_files) == 1:
+        # A single silent scene needs no concat list or filter graph: stream-
+        # copy its video track alone, matching what the multi-scene path maps.
+        # A copy, not a link, so rerunning step4 cannot rewrite the film.
+        source = os.path.join(video_clips_dir, video_files[0][1])
+        (
+            ffmpeg.input(source)
+            .output(final_output_path, vcodec='copy', an=None)
+            .global_args('-loglevel', 'error')
+            .run(overwrite_output=True)
+        )
+        print(f"Final film assembled at {final_output_path}")
+        return
 
-        # Get soundtrack for the scene
-        soundtrack_path = os.path.join(soundtrack_dir, f"scene_{scene_num:03d}_soundtrack.mp3")
-        if os.path.exists(soundtrack_path):
-            soundtrack_input = ffmpeg.input(soundtrack_path)
-        else:
-            soundtrack_input = None
-
-        # Combine audio
-        if concatenated_dialogue and soundtrack_input:
-            # With audio ducking
-            combined_audio = ffmpeg.filter_complex(
-                [
-                    soundtrack_input.audio,
-                    concatenated_dialogue.audio
-                ],
-                "[0]volume=0.3[a0];[1]volume=1.0[a1];[a0][a1]amix=inputs=2:duration=first[a]"
-            )
-        elif concatenated_dialogue:
-            combined_audio = concatenated_dialogue.audio
-        elif soundtrack_input:
-            combined_audio = soundtrack_input.audio
-        else:
-            combined_audio = None
+    video_paths = [os.path.abspath(os.path.join(video_clips_dir, f)) for _, f in video_files]
+    concat_file_path = os.path.join(output_dir, "concat.txt")
+    with open(concat_file_path, "w") as f:
+        for path in video_paths:
+            f.write(f"file '{path}'\n")
+    try:
+        video = ffmpeg.input(concat_file_path, format='concat', safe=0).video
 
-        # Mux video and audio
-        output_path = os.path.join(temp_dir, f"scene_{scene_num:03d}.mp4")
-        if combined_audio:
-            (ffmpeg.output(video_input.video, combined_audio, output_path, vcodec='copy', acodec='aac', shortest=None)
-             .run(overwrite_output=True))
-        else:
-            (ffmpeg.output(video_input.video, output_path, vcodec='copy')
-             .run(overwrite_output=True))
-        processed_scene_files.append(output_path)
+        if has_audio:
+            # Each probe is its own ffprobe process and scenes are independent,
+            # so run them side by side rather than one after another.
+            with ThreadPoolExecutor(max_workers=min(os.cpu_count() or 1, 8)) as ex:
+                durations = list(ex.map(_probe_duration, video_paths))
 
-    # Concatenate all processed scenes
-    if processed_scene_files:
-        concat_file_path = os.path.join(output_dir, "concat.txt") # Changed to output_dir
-        with open(concat_file_path, "w") as f:
-            for path in processed_scene_files:
-                f.write(f"file '{os.path.basename(path)}'\n")
+            audio_segments = []
+            for (scene_num, _), duration in zip(video_files, durations):
+                dialogue_files = dialogue_by_scene.get(scene_num, [])
+                soundtrack_name = _soundtrack_name(scene_num)
+                soundtrack_path = os.path.join(soundtrack_dir, soundtrack_name) if soundtrack_name in soundtracks else None
+                audio_segments.append(_scene_audio(duration, dialogue_files, soundtrack_path))
 
-        final_output_path = os.path.join(output_dir, output_filename)
-        (ffmpeg.input(concat_file_path, format='concat', safe=0)
-         .output(final_output_path, c='copy').run(overwrite_output=True))
+            audio = ffmpeg.concat(*audio_segments, v=0, a=1)
+            out = ffmpeg.output(video, audio, final_output_path, vcodec='copy', acodec='aac')
+        else:
+            out = ffmpeg.output(video, final_output_path, vcodec='copy')
+        out.global_args('-loglevel', 'error').run(overwrite_output=True)
+    finally:
+        os.remove(concat_file_path)
 
-        print(f"Final film assembled at {final_output_path}")
+    print(f"Final film assembled at {final_output_path}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Assemble the final film from scenes, dialogue, and soundtracks.")
@@ -1,6 +1,29 @@
 import argparse
-import json
 import os
+import re
+import sys
+try:
+    from . import utils  # type: ignore
+except Exception:
+    # Allow running as a script: python src/step_sound_design.py
+    sys.path.append(os.path.dirname(__file__))
+    import utils  # type: ignore
+
+SOUND_EFFECT_KEYWORDS = {
+    "door": "door_creak.mp3",
+    "footsteps": "footsteps.mp3",
+    "car": "car_pass_by.mp3",
+    "rain": "rain_loop.mp3",
+    "explosion": "explosion.mp3",
+    "wind": "wind_howl.mp3",
+    "scream": "scream.mp3",
+    "gunshot": "gunshot.mp3",
+    "water": "water_splash.mp3",
+    "fire": "fire_crackling.mp3",
+}
+# One scan per summary finds every keyword; the lookahead reports matches at
+# each position so overlapping keywords are not missed.
+_KEYWORD_RE = re.compile("(?=(" + "|".join(map(re.escape, SOUND_EFFECT_KEYWORDS)) + "))")
 
 def generate_sound_effects(
     narrative_schema_path: str,
@@ -8,8 +31,7 @@ def generate_sound_effects(
 ):
     """Generates placeholder sound effects based on narrative schema."""
 
-    with open(narrative_schema_path, "r") as f:
-        schema = json.load(f)
+    schema = utils.load_json(narrative_schema_path)
 
     scenes = schema.get("scenes", [])
 
@@ -19,32 +41,20 @@ def generate_sound_effects(
 
     os.makedirs(output_dir, exist_ok=True)
 
-    sound_effect_keywords = {
-        "door": "door_creak.mp3",
-        "footsteps": "footsteps.mp3",
-        "car": "car_pass_by.mp3",
-        "rain": "rain_loop.mp3",
-        "explosion": "explosion.mp3",
-        "wind": "wind_howl.mp3",
-        "scream": "scream.mp3",
-        "gunshot": "gunshot.mp3",
-        "water": "water_splash.mp3",
-        "fire": "fire_crackling.mp3",
-    }
-
     for i, scene in enumerate(scenes):
         scene_num = i + 1
         scene_summary = scene.get("summary", "").lower()
         
+        found = set(_KEYWORD_RE.findall(scene_summary))
+
         found_sfx_count = 0
-        for keyword, sfx_filename in sound_effect_keywords.items():
-            if keyword in scene_summary:
+        for keyword, sfx_filename in SOUND_EFFECT_KEYWORDS.items():
+            if keyword in found:
                 found_sfx_count += 1
                 sfx_output_path = os.path.join(output_dir, f"scene_{scene_num:03d}_sfx_{found_sfx_count:03d}_{sfx_filename}")
                 
-                # Create a placeholder empty MP3 file
-                with open(sfx_output_path, "wb") as f:
-                    f.write(b'') # Empty file
+                # Create (or truncate) a placeholder empty MP3 file
+                os.close(os.open(sfx_output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644))
 
                 print(f"Placeholder sound effect '{sfx_filename}' generated for Scene {scene_num} at {sfx_output_path}")
 
@@ -1,8 +1,18 @@
 import argparse
+import functools
+import hashlib
 import json
 import os
 import re
-from typing import Any, Dict, List, Optional, Tuple
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
 
 try:
     from dotenv import load_dotenv  # type: ignore
@@ -29,6 +39,11 @@ def add_vertex_args(parser: argparse.ArgumentParser) -> None:
     )
 
 
+def parse_regions(location: Optional[str]) -> List[str]:
+    """Split a comma-separated --location value into a list of regions."""
+    return [r.strip() for r in (location or "").split(",") if r.strip()]
+
+
 def add_style_args(parser: argparse.ArgumentParser) -> None:
     parser.add_argument(
         "--style-profile",
@@ -44,18 +59,38 @@ def add_scene_shot_args(parser: argparse.ArgumentParser) -> None:
     parser.add_argument("--shot", help="The shot number to generate.", type=int)
 
 
+def add_concurrency_args(parser: argparse.ArgumentParser, default: int = 8) -> None:
+    parser.add_argument(
+        "--concurrency",
+        "--max-concurrency",
+        dest="concurrency",
+        type=int,
+        default=default,
+        help="Maximum number of concurrent Vertex AI requests.",
+    )
+
+
 # -----------------------
 # Settings/Style utilities
 # -----------------------
 def load_json(path: str) -> Any:
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
 def save_json(path: str, data: Any) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    tmp_path = path + ".tmp"
+    if orjson is not None:
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
 
 
 def resolve_style_profile(
@@ -65,33 +100,35 @@ def resolve_style_profile(
     default: str = "photorealistic",
     persist: bool = True,
 ) -> str:
+    # Read the settings file once (cached until it changes) for both the
+    # lookup and the persist check below.
+    try:
+        settings: Dict[str, Any] = load_json_cached(project_settings_file) or {}
+    except Exception:
+        settings = {}
+    if not isinstance(settings, dict):
+        settings = {}
+
     style_profile: Optional[str] = None
     if cli_style_profile:
         style_profile = cli_style_profile
     elif legacy_style:
         style_profile = legacy_style
     else:
-        if os.path.exists(project_settings_file):
-            try:
-                settings = load_json(project_settings_file)
-                style_profile = settings.get("style_profile") or settings.get("style")
-            except Exception:
-                style_profile = None
+        style_profile = settings.get("style_profile") or settings.get("style")
     if not style_profile:
         style_profile = default
 
     if persist:
         try:
-            existing: Dict[str, Any] = {}
-            if os.path.exists(project_settings_file):
-                try:
-                    existing = load_json(project_settings_file) or {}
-                except Exception:
-                    existing = {}
-            existing["style_profile"] = style_profile
-            # Maintain legacy key for other scripts
-            existing["style"] = style_profile
-            save_json(project_settings_file, existing)
+            # Skip the rewrite on repeat runs with an unchanged style.
+            if settings.get("style_profile") != style_profile or settings.get("style") != style_profile:
+                # Copy: the cached dict is shared with other callers.
+                existing = dict(settings)
+                existing["style_profile"] = style_profile
+                # Maintain legacy key for other scripts
+                existing["style"] = style_profile
+                save_json(project_settings_file, existing)
         except Exception:
             # Non-fatal if we cannot persist
             pass
@@ -99,17 +136,30 @@ def resolve_style_profile(
     return style_profile
 
 
-def resolve_style_prompt(style_profile: str, config_path: str = "config.json") -> str:
-    """Map a style_profile to a concrete style prompt via config.json, or fallback to the raw profile."""
+@functools.lru_cache(maxsize=64)
+def _load_json_cached(path: str, mtime_ns: int) -> Any:
+    # mtime is part of the cache key so edits to the file are picked up.
+    return load_json(path)
+
+
+def load_json_cached(path: str) -> Any:
+    """load_json memoized on (path, mtime); treat the result as read-only."""
+    return _load_json_cached(path, os.stat(path).st_mtime_ns)
+
+
+def load_styles(config_path: str = "config.json") -> Dict[str, str]:
+    """Return the ``styles`` map from config.json (cached until the file changes), or {}."""
     try:
-        cfg = load_json(config_path)
-        styles_map = cfg.get("styles", {}) if isinstance(cfg, dict) else {}
-        mapped = styles_map.get(style_profile)
-        return mapped or style_profile
-    except FileNotFoundError:
-        return style_profile
+        cfg = load_json_cached(config_path)
     except Exception:
-        return style_profile
+        return {}
+    styles_map = cfg.get("styles", {}) if isinstance(cfg, dict) else {}
+    return styles_map if isinstance(styles_map, dict) else {}
+
+
+def resolve_style_prompt(style_profile: str, config_path: str = "config.json") -> str:
+    """Map a style_profile to a concrete style prompt via config.json, or fallback to the raw profile."""
+    return load_styles(config_path).get(style_profile) or style_profile
 
 
 def load_env(env_file: Optional[str] = None) -> None:
@@ -121,6 +171,144 @@ def load_env(env_file: Optional[str] = None) -> None:
         load_dotenv()
 
 
+# -------------
+# Retry helpers
+# -------------
+def retry_call(
+    fn: Callable[..., Any],
+    *args: Any,
+    attempts: int = 3,
+    base_delay: float = 1.0,
+    **kwargs: Any,
+) -> Any:
+    """Call fn, retrying on any exception with exponential backoff (1s, 2s, ...)."""
+    for attempt in range(attempts):
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(base_delay * (2 ** attempt))
+
+
+# ------------------------
+# Generated-image memoization
+# ------------------------
+# Opt-in (CINEFORGE_IMAGE_CACHE=1) content-addressed copies of generated
+# images, so an identical request reuses the image even when it targets a
+# different output path (e.g. the same character rendered by two entry
+# points).  The key covers the prompt and the generation parameters, so a
+# 9:16 portrait and a 16:9 plate with the same text never share an entry.
+IMAGE_CACHE_DIR = os.path.join("output", ".image_cache")
+
+
+def _prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def _image_cache_enabled() -> bool:
+    return os.environ.get("CINEFORGE_IMAGE_CACHE") == "1"
+
+
+def _image_cache_key(prompt: str, params: Dict[str, Any]) -> str:
+    payload = json.dumps({"p": prompt, "g": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _image_cache_path(key: str, image_path: str) -> str:
+    return os.path.join(IMAGE_CACHE_DIR, key + os.path.splitext(image_path)[1])
+
+
+def _restore_cached_image(key: str, image_path: str) -> bool:
+    cached = _image_cache_path(key, image_path)
+    if not os.path.exists(cached):
+        return False
+    os.makedirs(os.path.dirname(image_path) or ".", exist_ok=True)
+    root, ext = os.path.splitext(image_path)
+    tmp = f"{root}.tmp{ext}"
+    shutil.copyfile(cached, tmp)
+    os.replace(tmp, image_path)
+    return True
+
+
+def prompt_cache_hit(
+    image_path: str,
+    prompt: str,
+    force: bool = False,
+    *,
+    model: Optional[str] = None,
+    aspect_ratio: Optional[str] = None,
+    number_of_images: int = 1,
+) -> bool:
+    """True if image_path exists and its .prompt sidecar matches the prompt hash.
+
+    With CINEFORGE_IMAGE_CACHE=1, a sidecar miss falls back to the shared image
+    cache, keyed on the prompt plus model, aspect_ratio and number_of_images;
+    a hit there is copied to image_path.  Set force=True (or CINEFORGE_FORCE=1)
+    to always regenerate.
+    """
+    if force or os.environ.get("CINEFORGE_FORCE") == "1":
+        return False
+    key = _prompt_hash(prompt)
+    try:
+        with open(image_path + ".prompt", "r", encoding="utf-8") as f:
+            cached = f.read().strip()
+    except OSError:
+        cached = None
+    if cached == key and os.path.exists(image_path):
+        return True
+    if not _image_cache_enabled():
+        return False
+    params = {"model": model, "aspect_ratio": aspect_ratio, "number_of_images": number_of_images}
+    if _restore_cached_image(_image_cache_key(prompt, params), image_path):
+        record_prompt(image_path, prompt, store=False)
+        return True
+    return False
+
+
+def record_prompt(
+    image_path: str,
+    prompt: str,
+    store: bool = True,
+    *,
+    model: Optional[str] = None,
+    aspect_ratio: Optional[str] = None,
+    number_of_images: int = 1,
+) -> None:
+    """Atomically write the prompt hash sidecar for a freshly generated image.
+
+    With store=True and CINEFORGE_IMAGE_CACHE=1 the image is also copied into
+    the shared image cache under its prompt and generation parameters.
+    """
+    sidecar = image_path + ".prompt"
+    tmp = sidecar + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(_prompt_hash(prompt))
+    os.replace(tmp, sidecar)
+    if not (store and _image_cache_enabled()):
+        return
+    params = {"model": model, "aspect_ratio": aspect_ratio, "number_of_images": number_of_images}
+    os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+    cached = _image_cache_path(_image_cache_key(prompt, params), image_path)
+    tmp = cached + ".tmp"
+    shutil.copyfile(image_path, tmp)
+    os.replace(tmp, cached)
+
+
+def normalize_asset_key(name: str) -> str:
+    """Case- and whitespace-insensitive key for deduplicating character/location names."""
+    return " ".join(name.lower().split())
+
+
+def dedupe_by_name(names: Iterable[Optional[str]]) -> List[str]:
+    """Drop empty and near-duplicate names (case/whitespace), keeping the first spelling in order."""
+    seen: Dict[str, str] = {}
+    for name in names:
+        if name:
+            seen.setdefault(normalize_asset_key(name), name)
+    return list(seen.values())
+
+
 # --------------------
 # Storyboard utilities
 # --------------------
@@ -132,20 +320,142 @@ def parse_storyboard_shots(storyboard_content: str) -> List[Tuple[str, str, str]
     return SHOT_REGEX.findall(storyboard_content)
 
 
+@functools.lru_cache(maxsize=64)
+def _shot_regex_for(scene: Optional[int], shot: Optional[int]) -> "re.Pattern[str]":
+    if scene is None and shot is None:
+        return SHOT_REGEX
+    scene_pat = rf"0*{int(scene)}" if scene is not None else r"\d+"
+    shot_pat = rf"0*{int(shot)}" if shot is not None else r"\d+"
+    return re.compile(rf"SCENE ({scene_pat}), SHOT ({shot_pat}):\n(.*?)(?=\nSCENE|\Z)", re.DOTALL)
+
+
+def iter_storyboard_shots(
+    storyboard_content: str,
+    scene: Optional[int] = None,
+    shot: Optional[int] = None,
+) -> Iterator[Tuple[str, str, str]]:
+    """Lazily yield (scene_number, shot_number, description) without building a list.
+
+    When scene and/or shot are given they are baked into the pattern, so the
+    regex engine skips non-matching blocks instead of Python filtering them.
+    """
+    for m in _shot_regex_for(scene, shot).finditer(storyboard_content):
+        yield m.group(1), m.group(2), m.group(3)
+
+
+@functools.lru_cache(maxsize=4)
+def _storyboard_shots_cached(path: str, mtime: float) -> Tuple[Tuple[str, str, str], ...]:
+    return tuple((sc, sh, desc.strip()) for sc, sh, desc in iter_storyboard_shots(read_text(path)))
+
+
+def load_storyboard_shots(path: str) -> Tuple[Tuple[str, str, str], ...]:
+    """Return (scene_number, shot_number, description) for every shot in a storyboard file.
+
+    Parsed once per file version, so steps run in the same process (step3's
+    generators called from step4, say) share one read and one parse.
+    """
+    return _storyboard_shots_cached(path, os.path.getmtime(path))
+
+
+# Optional ```json fence around a model response, tolerant of surrounding whitespace.
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*\n?(.*?)(?:\n?```)?\s*$", re.DOTALL)
+
+
+def strip_json_fence(text: str) -> str:
+    """Return the body of a fenced (```json ... ```) response, or the stripped text."""
+    m = _FENCE_RE.match(text)
+    return m.group(1) if m else text.strip()
+
+
+def write_stream(src: Any, path: str, chunk_size: int = 1024 * 1024) -> None:
+    """Copy a file-like src to path in chunks rather than one full read(), atomically."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        try:
+            shutil.copyfileobj(src, out, length=chunk_size)
+        except TypeError:
+            # Objects whose read() takes no size argument: fall back to one read.
+            out.write(src.read())
+    os.replace(tmp_path, path)
+
+
+def save_image(image: Any, path: str) -> None:
+    """Atomically save a Vertex GeneratedImage to path."""
+    root, ext = os.path.splitext(path)
+    # Keep the real extension last so the image format is still inferred.
+    tmp_path = f"{root}.tmp{ext}"
+    image.save(location=tmp_path, include_generation_parameters=True)
+    os.replace(tmp_path, path)
+
+
+def write_text(path: str, text: str) -> None:
+    """Write UTF-8 text via a temp file and os.replace, so readers never see a torn file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
 def read_text(path: str) -> str:
     with open(path, "r", encoding="utf-8", errors="ignore") as f:
         return f.read()
 
 
-def get_characters_in_shot(shot_description: str, narrative_schema: Dict[str, Any]) -> List[str]:
-    return [c["name"] for c in narrative_schema.get("characters", []) if c.get("name") in shot_description]
+# id(schema) -> (schema, (character names, scene_number -> setting)) for the
+# most recently indexed narrative schemas.  Each entry holds a reference to its
+# schema, so an id cannot be reused while it is cached.  Lookups come from
+# worker threads, hence the lock.
+_SCHEMA_INDEX_SLOTS = 8
+_schema_indexes: Dict[int, Tuple[Any, Any]] = {}
+_schema_indexes_lock = threading.Lock()
 
 
-def get_scene_setting(scene_number: int, narrative_schema: Dict[str, Any]) -> str:
+def _schema_index(narrative_schema: Dict[str, Any]) -> Tuple[Tuple[str, ...], Dict[Any, str]]:
+    with _schema_indexes_lock:
+        cached = _schema_indexes.get(id(narrative_schema))
+    if cached is not None and cached[0] is narrative_schema:
+        return cached[1]
+    names = tuple(c["name"] for c in narrative_schema.get("characters", []) if c.get("name"))
+    settings: Dict[Any, str] = {}
     for scene in narrative_schema.get("scenes", []):
         try:
-            if scene.get("scene_number") == int(scene_number):
-                return scene.get("setting", "") or ""
+            settings.setdefault(scene.get("scene_number"), scene.get("setting", "") or "")
         except Exception:
             continue
-    return ""
+    index = (names, settings)
+    with _schema_indexes_lock:
+        _schema_indexes[id(narrative_schema)] = (narrative_schema, index)
+        while len(_schema_indexes) > _SCHEMA_INDEX_SLOTS:
+            # Dicts keep insertion order, so this evicts the oldest entry.
+            del _schema_indexes[next(iter(_schema_indexes))]
+    return index
+
+
+@functools.lru_cache(maxsize=32)
+def _character_pattern(names: Tuple[str, ...]) -> "re.Pattern[str]":
+    # Longest names first so "Anna" wins over "Ann" at the same position;
+    # dict.fromkeys keeps ties in schema order so the pattern is identical
+    # from run to run regardless of string hash seeding.  The zero-width
+    # lookahead tries every position, so overlapping names ("Anna" and "nab"
+    # in "Annab") are all reported rather than consumed by the first match.
+    ordered = sorted(dict.fromkeys(names), key=len, reverse=True)
+    return re.compile("(?=(" + "|".join(map(re.escape, ordered)) + "))")
+
+
+def get_characters_in_shot(shot_description: str, narrative_schema: Dict[str, Any]) -> List[str]:
+    names = _schema_index(narrative_schema)[0]
+    if not names:
+        return []
+    # One scan of the description via a cached alternation instead of one
+    # substring search per character.  Names that are a prefix of a longer
+    # match at the same position (e.g. "Ann" within "Anna") are still
+    # reported, as before.
+    found = set(_character_pattern(names).findall(shot_description))
+    return [n for n in names if n in found or any(n in f for f in found)]
+
+
+def get_scene_setting(scene_number: int, narrative_schema: Dict[str, Any]) -> str:
+    try:
+        return _schema_index(narrative_schema)[1].get(int(scene_number), "")
+    except (TypeError, ValueError):
+        return ""
@@ -0,0 +1,67 @@
+"""Process-wide memoization of Vertex AI initialisation and model handles.
+
+``vertexai.init`` and model construction resolve credentials and endpoints;
+doing that once per (project, location) instead of once per request keeps
+tight generation loops from paying the setup cost repeatedly.  Model handles
+are keyed on project and location as well as name because the SDK binds the
+active location into each model when it is constructed.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import vertexai
+from vertexai.generative_models import GenerativeModel
+from vertexai.preview.vision_models import VideoGenerationModel
+from vertexai.vision_models import ImageGenerationModel
+
+# vertexai.init sets process-global defaults, so remember which
+# (project, location) is active and only re-initialise when it changes.
+_active: Optional[Tuple[str, str]] = None
+_lock = threading.Lock()
+
+# Model handles by (kind, project, location, name).  Construction happens
+# under a lock so a pool of workers starting together builds each handle once
+# instead of every thread missing the cache at the same time.
+_models: Dict[Tuple[str, str, str, str], Any] = {}
+_models_lock = threading.Lock()
+
+# Default Imagen model; also part of the generated-image cache key.
+IMAGE_MODEL = "imagen-3.0-fast-generate-001"
+
+
+def ensure_vertex(project: str, location: str) -> None:
+    global _active
+    with _lock:
+        if _active != (project, location):
+            vertexai.init(project=project, location=location)
+            _active = (project, location)
+
+
+def _get_or_create(kind: str, project: str, location: str, model_name: str, factory: Callable[[str], Any]) -> Any:
+    key = (kind, project, location, model_name)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            ensure_vertex(project, location)
+            model = _models[key] = factory(model_name)
+        return model
+
+
+def get_generative_model(project: str, location: str, model_name: str) -> GenerativeModel:
+    return _get_or_create("generative", project, location, model_name, GenerativeModel)
+
+
+def get_image_model(
+    project: str, location: str, model_name: str = IMAGE_MODEL
+) -> ImageGenerationModel:
+    return _get_or_create("image", project, location, model_name, ImageGenerationModel.from_pretrained)
+
+
+def get_video_model(
+    project: str, location: str, model_name: str = "veo-3.0-fast-generate-001"
+) -> VideoGenerationModel:
+    return _get_or_create("video", project, location, model_name, VideoGenerationModel.from_pretrained)
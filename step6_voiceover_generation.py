@@ -1,17 +1,26 @@
 import argparse
+import io
 import os
-from typing import List
+from functools import lru_cache
 from google.cloud import texttospeech
 
 
+@lru_cache(maxsize=1)
+def _client() -> texttospeech.TextToSpeechClient:
+    """Return a process-wide Text-to-Speech client, created on first use."""
+    return texttospeech.TextToSpeechClient()
+
+
 def extract_dialogue(screenplay: str) -> str:
     """Extract dialogue lines from a screenplay.
 
     This simple extractor ignores scene headings, character names (assumed uppercase),
     and parenthetical directions starting with '('.
     """
-    lines: List[str] = []
-    for raw_line in screenplay.splitlines():
+    # Write kept lines straight into one buffer instead of collecting a list
+    # of strings to join; iterating a StringIO also avoids splitlines' list.
+    buf = io.StringIO()
+    for raw_line in io.StringIO(screenplay):
         line = raw_line.strip()
         if not line:
             continue
@@ -22,13 +31,14 @@ def extract_dialogue(screenplay: str) -> str:
         if line.startswith("("):
             continue
         # Keep dialogue or action lines
-        lines.append(line)
-    return " ".join(lines)
+        buf.write(line)
+        buf.write(" ")
+    return buf.getvalue().rstrip()
 
 
 def generate_voiceover(project_id: str, screenplay_path: str, output_path: str) -> None:
     """Generate a voiceover audio file from a screenplay using Google Cloud Text-to-Speech."""
-    client = texttospeech.TextToSpeechClient()
+    client = _client()
     with open(screenplay_path, "r", encoding="utf-8") as f:
         screenplay = f.read()
     dialogue = extract_dialogue(screenplay)
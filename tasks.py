@@ -2,6 +2,7 @@ import os
 import json
 from typing import Optional, Tuple
 from celery import states
+from celery.signals import worker_process_init
 
 from celery_app import celery_app
 
@@ -12,15 +13,26 @@ from src.pipeline import (
     generate_visual_assets,
     synthesize_video_from_storyboard,
 )
+from src import vertex_init
 from project_utils import (
     init_project,
+    load_project,
     update_step,
+    update_steps,
     derive_project_name_from_story_file,
     derive_project_name_from_schema_file,
     derive_project_name_from_storyboard_file,
 )
 
 
+# Optional Celery rate limit (e.g. "20/s" or "300/m") for the single-stage
+# tasks that call Vertex AI, so a busy worker stays inside the project's request
+# quota instead of tripping 429s and burning retries.  Celery applies it per
+# worker.  full_pipeline_task is left unlimited: one start there runs for
+# minutes, so a per-request quota says nothing useful about it.
+VERTEX_RATE_LIMIT = os.environ.get("CINEFORGE_VERTEX_RATE_LIMIT") or None
+
+
 def _require_env(project: Optional[str], location: Optional[str]) -> Tuple[str, str]:
     proj = project or os.environ.get("VERTEX_PROJECT_ID")
     loc = location or os.environ.get("VERTEX_LOCATION", "us-central1")
@@ -29,12 +41,37 @@ def _require_env(project: Optional[str], location: Optional[str]) -> Tuple[str,
     return proj, loc
 
 
+def _reusable_output(project_name: str, step_key: str, output_key: str) -> Optional[str]:
+    """Return a step's recorded output if the step succeeded and the file is still there."""
+    step = ((load_project(project_name) or {}).get("steps") or {}).get(step_key) or {}
+    path = (step.get("outputs") or {}).get(output_key)
+    if step.get("status") == "success" and path and os.path.exists(path):
+        return path
+    return None
+
+
+@worker_process_init.connect
+def _init_vertex_in_worker(**_kwargs):
+    """Initialise Vertex AI once per worker process, after the fork.
+
+    vertex_init memoizes the (project, location) it was initialised for, so
+    tasks for the configured project skip vertexai.init entirely; gRPC state
+    must not be created before the prefork pool forks, hence the signal.
+    """
+    try:
+        project, location = _require_env(None, None)
+    except ValueError:
+        return
+    vertex_init.ensure_vertex(project, location)
+
+
 @celery_app.task(
     bind=True,
     name="cineforge.deconstruct_narrative_task",
     autoretry_for=(Exception,),
     retry_backoff=True,
     retry_kwargs={"max_retries": 3},
+    rate_limit=VERTEX_RATE_LIMIT,
 )
 def deconstruct_narrative_task(self, story_file: str, project: Optional[str] = None, location: Optional[str] = None):
     try:
@@ -62,18 +99,23 @@ def deconstruct_narrative_task(self, story_file: str, project: Optional[str] = N
     autoretry_for=(Exception,),
     retry_backoff=True,
     retry_kwargs={"max_retries": 3},
+    rate_limit=VERTEX_RATE_LIMIT,
 )
 def generate_screenplay_and_storyboard_task(self, schema_file: str, project: Optional[str] = None, location: Optional[str] = None):
     try:
         project, location = _require_env(project, location)
         project_name = derive_project_name_from_schema_file(schema_file)
         init_project(project_name)
-        update_step(project_name, "screenplay_generated", status="running")
-        update_step(project_name, "storyboard_generated", status="running")
+        update_steps(project_name, {
+            "screenplay_generated": {"status": "running"},
+            "storyboard_generated": {"status": "running"},
+        })
         self.update_state(state=states.STARTED, meta={"stage": "script+storyboard", "msg": "Generating screenplay and storyboard"})
         screenplay_file, storyboard_file = generate_screenplay_and_storyboard(schema_file, project, location)
-        update_step(project_name, "screenplay_generated", status="success", outputs={"screenplay_file": screenplay_file})
-        update_step(project_name, "storyboard_generated", status="success", outputs={"storyboard_file": storyboard_file})
+        update_steps(project_name, {
+            "screenplay_generated": {"status": "success", "outputs": {"screenplay_file": screenplay_file}},
+            "storyboard_generated": {"status": "success", "outputs": {"storyboard_file": storyboard_file}},
+        })
         return {
             "screenplay_file": screenplay_file,
             "storyboard_file": storyboard_file,
@@ -82,8 +124,10 @@ def generate_screenplay_and_storyboard_task(self, schema_file: str, project: Opt
     except Exception as e:
         try:
             project_name = derive_project_name_from_schema_file(schema_file)
-            update_step(project_name, "screenplay_generated", status="failed", error=str(e))
-            update_step(project_name, "storyboard_generated", status="failed", error=str(e))
+            update_steps(project_name, {
+                "screenplay_generated": {"status": "failed", "error": str(e)},
+                "storyboard_generated": {"status": "failed", "error": str(e)},
+            })
         except Exception:
             pass
         self.update_state(state=states.FAILURE, meta={"exc": str(e)})
@@ -96,6 +140,7 @@ def generate_screenplay_and_storyboard_task(self, schema_file: str, project: Opt
     autoretry_for=(Exception,),
     retry_backoff=True,
     retry_kwargs={"max_retries": 3},
+    rate_limit=VERTEX_RATE_LIMIT,
 )
 def generate_visual_assets_task(self, storyboard_file: str, schema_file: str, project: Optional[str] = None, location: Optional[str] = None, style: Optional[str] = None):
     try:
@@ -130,18 +175,35 @@ def full_pipeline_task(self, story_file: str, project: Optional[str] = None, loc
         project, location = _require_env(project, location)
         project_name = derive_project_name_from_story_file(story_file)
         init_project(project_name)
-        self.update_state(state=states.STARTED, meta={"stage": "deconstruct", "progress": 0.1, "msg": "Deconstructing narrative"})
-        update_step(project_name, "narrative_deconstructed", status="running")
-        schema_file = deconstruct_narrative(story_file, project, location)
-        update_step(project_name, "narrative_deconstructed", status="success", outputs={"schema_file": schema_file})
-        self.update_state(state=states.STARTED, meta={"stage": "script+storyboard", "progress": 0.45, "msg": "Generating screenplay & storyboard"})
-        update_step(project_name, "screenplay_generated", status="running")
-        update_step(project_name, "storyboard_generated", status="running")
-        screenplay_file, storyboard_file = generate_screenplay_and_storyboard(schema_file, project, location)
-        update_step(project_name, "screenplay_generated", status="success", outputs={"screenplay_file": screenplay_file})
-        update_step(project_name, "storyboard_generated", status="success", outputs={"storyboard_file": storyboard_file})
+        # On an autoretry, pick up after the stages that already finished
+        # rather than spending quota regenerating them.
+        resuming = self.request.retries > 0
+        schema_file = _reusable_output(project_name, "narrative_deconstructed", "schema_file") if resuming else None
+        finished: dict = {}
+        if schema_file is None:
+            self.update_state(state=states.STARTED, meta={"stage": "deconstruct", "progress": 0.1, "msg": "Deconstructing narrative"})
+            update_step(project_name, "narrative_deconstructed", status="running")
+            schema_file = deconstruct_narrative(story_file, project, location)
+            finished = {"narrative_deconstructed": {"status": "success", "outputs": {"schema_file": schema_file}}}
+        # A freshly regenerated schema invalidates any earlier script.
+        resuming = resuming and not finished
+        screenplay_file = _reusable_output(project_name, "screenplay_generated", "screenplay_file") if resuming else None
+        storyboard_file = _reusable_output(project_name, "storyboard_generated", "storyboard_file") if resuming else None
+        if screenplay_file is None or storyboard_file is None:
+            # Finishing one stage and starting the next is a single state write.
+            update_steps(project_name, {
+                **finished,
+                "screenplay_generated": {"status": "running"},
+                "storyboard_generated": {"status": "running"},
+            })
+            self.update_state(state=states.STARTED, meta={"stage": "script+storyboard", "progress": 0.45, "msg": "Generating screenplay & storyboard"})
+            screenplay_file, storyboard_file = generate_screenplay_and_storyboard(schema_file, project, location)
+            finished = {
+                "screenplay_generated": {"status": "success", "outputs": {"screenplay_file": screenplay_file}},
+                "storyboard_generated": {"status": "success", "outputs": {"storyboard_file": storyboard_file}},
+            }
+        update_steps(project_name, {**finished, "visual_assets_generated": {"status": "running"}})
         self.update_state(state=states.STARTED, meta={"stage": "assets", "progress": 0.75, "msg": "Generating visual assets"})
-        update_step(project_name, "visual_assets_generated", status="running")
         generate_visual_assets(storyboard_file, schema_file, project, location, style=style)
         update_step(project_name, "visual_assets_generated", status="success")
         self.update_state(state=states.STARTED, meta={"stage": "video", "progress": 0.9, "msg": "Synthesizing video (placeholder)"})
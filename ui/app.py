@@ -1,10 +1,19 @@
 import os
+import html
 import io
 import json
-import glob
+import re
+import shutil
 import sys
 import pathlib
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
 
 # Ensure we can import utils whether run from project root or UI folder
 try:
@@ -15,12 +24,10 @@ except Exception:
     sys.path.append(str(SRC_DIR))
     import utils  # type: ignore
 
-# Import pipeline functions
-import sys
-import pathlib
-sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
-import api as cine_api
+# Every pipeline step runs in the backend; the UI only talks to it over HTTP,
+# so the Vertex AI SDK is never imported or initialised in this process.
 import requests
+from requests.adapters import HTTPAdapter
 
 
 utils.load_env()
@@ -37,14 +44,8 @@ with st.sidebar:
     project = st.text_input("GCP Project ID", value=default_project, placeholder="my-gcp-project")
     location = st.text_input("Vertex AI Location", value=default_location)
 
-    # Load style options
-    styles_map = {}
-    try:
-        with open("config.json", "r") as f:
-            cfg = json.load(f)
-            styles_map = cfg.get("styles", {})
-    except Exception:
-        pass
+    # Load style options (memoized on the file's mtime, so reruns skip the parse)
+    styles_map = utils.load_styles()
 
     styles = list(styles_map.keys()) or ["3d-cartoon", "cinematic-anime", "photorealistic"]
     style_key = st.selectbox("Style preset", styles, index=0)
@@ -57,6 +58,9 @@ with st.sidebar:
     st.markdown("---")
     default_backend = os.environ.get("BACKEND_URL", "http://localhost:8001")
     st.session_state.backend_url = st.text_input("Backend API URL", value=default_backend)
+    # Backend URL as seen from the browser (BACKEND_URL may be an internal
+    # hostname); when set, images load from the backend's /files route.
+    public_backend_url = os.environ.get("PUBLIC_BACKEND_URL", "").rstrip("/")
 
     st.markdown("---")
     st.checkbox("Auto-refresh task status", value=st.session_state.get("auto_refresh", True), key="auto_refresh")
@@ -64,28 +68,170 @@ with st.sidebar:
 
 
 # --- Session State ---
-if "project_name" not in st.session_state:
-    st.session_state.project_name = ""
-if "story_path" not in st.session_state:
-    st.session_state.story_path = ""
-if "schema_path" not in st.session_state:
-    st.session_state.schema_path = ""
-if "screenplay_path" not in st.session_state:
-    st.session_state.screenplay_path = ""
-if "storyboard_path" not in st.session_state:
-    st.session_state.storyboard_path = ""
-if "last_task_id" not in st.session_state:
-    st.session_state.last_task_id = ""
-if "last_task_state" not in st.session_state:
+# File locations and task status tracked across reruns.
+_STATE_DEFAULTS = {
+    "project_name": "",
+    "story_path": "",
+    "schema_path": "",
+    "screenplay_path": "",
+    "storyboard_path": "",
+    "video_file": "",
+    "soundtrack_dir": "",
+    "voiceover_file": "",
+    "final_film_file": "",
+    "last_task_id": "",
+    "last_task_state": "",
+    "last_task_result": None,
+    "auto_refresh": True,
+    "refresh_ms": 1500,
+    "selected_project": "",
+}
+
+
+def _init_state() -> None:
+    for key, value in _STATE_DEFAULTS.items():
+        if key not in st.session_state:
+            st.session_state[key] = value
+
+
+_init_state()
+
+
+def _json(res: requests.Response):
+    """Decode a backend response body, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(res.content)
+    return json.loads(res.content)
+
+
+@st.cache_resource
+def _session() -> requests.Session:
+    """One keep-alive HTTP session for backend calls, shared across reruns."""
+    sess = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    sess.mount("http://", adapter)
+    sess.mount("https://", adapter)
+    sess.headers["Connection"] = "keep-alive"
+    return sess
+
+
+@st.cache_data(show_spinner=False)
+def _list_pngs(dirpath: str, mtime: float) -> list:
+    # mtime is only a cache key: adding or removing an image changes it.
+    with os.scandir(dirpath) as it:
+        return sorted(e.path for e in it if e.name.endswith(".png") and e.is_file(follow_symlinks=False))
+
+
+def _image_grid_html(base_url: str, images: list) -> str:
+    """One CSS grid of lazily loaded <img> tags served from the backend's /files route."""
+    figures = "".join(
+        f"<figure style='margin:0'><img loading='lazy' style='width:100%' "
+        f"src='{html.escape(base_url)}/files/storyboard_images/{quote(os.path.basename(p))}'>"
+        f"<figcaption>{html.escape(os.path.basename(p))}</figcaption></figure>"
+        for p in images
+    )
+    return f"<div style='display:grid;grid-template-columns:repeat(3,1fr);gap:8px'>{figures}</div>"
+
+
+_SCENE_IMAGE_RE = re.compile(r"scene_(\d+)_")
+
+
+def _images_by_scene(images: list) -> dict:
+    """Group storyboard image paths by scene number; unmatched names go under 0."""
+    buckets: dict = {}
+    for path in images:
+        m = _SCENE_IMAGE_RE.match(os.path.basename(path))
+        buckets.setdefault(int(m.group(1)) if m else 0, []).append(path)
+    return buckets
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _read_text_cached(path: str, mtime: float, size: int, limit: int) -> str:
+    with open(path, "rb") as f:
+        data = f.read(limit)
+    return data.decode("utf-8", "ignore")
+
+
+def _stat(path: str):
+    """os.stat(path), or None when the path is unset or missing; one syscall per check."""
+    if not path:
+        return None
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _read_text(path: str, limit: int = 200_000, info=None) -> str:
+    """Read a text artifact for preview, at most ``limit`` bytes, cached until it changes.
+
+    Pass the ``_stat`` result already taken for the existence check as ``info``
+    so the file is not stat'ed twice.
+    """
+    info = info or os.stat(path)
+    return _read_text_cached(path, info.st_mtime, info.st_size, limit)
+
+
+# Celery states after which a task's status can no longer change.
+_TERMINAL_TASK_STATES = {"SUCCESS", "FAILURE", "REVOKED"}
+
+
+def _track_task(task_id: str) -> None:
+    # Forget the previous task's state so polling resumes for the new one.
+    st.session_state.last_task_id = task_id
     st.session_state.last_task_state = ""
-if "last_task_result" not in st.session_state:
     st.session_state.last_task_result = None
-if "auto_refresh" not in st.session_state:
-    st.session_state.auto_refresh = True
-if "refresh_ms" not in st.session_state:
-    st.session_state.refresh_ms = 1500
-if "selected_project" not in st.session_state:
-    st.session_state.selected_project = ""
+
+
+@st.cache_resource
+def _prefetch_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=2)
+
+
+def _task_status_url() -> str:
+    return f"{st.session_state.backend_url}/tasks/{st.session_state.last_task_id}"
+
+
+def _apply_task_status(data: dict) -> None:
+    st.session_state.last_task_state = data.get("state", "")
+    st.session_state.last_task_result = data.get("result")
+    if st.session_state.last_task_state == "SUCCESS":
+        _maybe_update_paths_from_result(st.session_state.last_task_result)
+
+
+def _poll_task_status(timeout: float) -> None:
+    res = _session().get(_task_status_url(), timeout=timeout)
+    res.raise_for_status()
+    _apply_task_status(_json(res))
+
+
+def _auto_poll_task_status() -> None:
+    """Poll for the auto-refresh rerun, using the status prefetched last time.
+
+    The next request is started in the background right away, so by the time
+    the timed rerun comes round its round trip has usually already finished.
+    If it has not, the last known state stays on screen and the same request
+    is checked again on the next rerun, so there is one request in flight at
+    a time.
+    """
+    task_id = st.session_state.last_task_id
+    prefetched = st.session_state.pop("status_prefetch", None)
+    if prefetched and prefetched[0] == task_id and not prefetched[1].done():
+        st.session_state.status_prefetch = prefetched
+        return
+    res = None
+    if prefetched and prefetched[0] == task_id:
+        try:
+            res = prefetched[1].result()
+        except Exception:
+            res = None
+    if res is not None and res.ok:
+        _apply_task_status(_json(res))
+    else:
+        _poll_task_status(timeout=15)
+    if st.session_state.last_task_state not in _TERMINAL_TASK_STATES:
+        future = _prefetch_pool().submit(_session().get, _task_status_url(), timeout=15)
+        st.session_state.status_prefetch = (task_id, future)
 
 
 def _maybe_update_paths_from_result(result: dict):
@@ -98,6 +244,14 @@ def _maybe_update_paths_from_result(result: dict):
             st.session_state.screenplay_path = result.get("screenplay_file") or st.session_state.screenplay_path
         if "storyboard_file" in result:
             st.session_state.storyboard_path = result.get("storyboard_file") or st.session_state.storyboard_path
+        if "video_file" in result:
+            st.session_state.video_file = result.get("video_file") or st.session_state.video_file
+        if "soundtrack_dir" in result:
+            st.session_state.soundtrack_dir = result.get("soundtrack_dir") or st.session_state.soundtrack_dir
+        if "voiceover_file" in result:
+            st.session_state.voiceover_file = result.get("voiceover_file") or st.session_state.voiceover_file
+        if "final_film_file" in result:
+            st.session_state.final_film_file = result.get("final_film_file") or st.session_state.final_film_file
     except Exception:
         pass
 
@@ -109,16 +263,22 @@ with col0a:
     st.session_state.project_name = st.text_input("Project name", value=st.session_state.project_name or "My_Film_Project")
     uploaded = st.file_uploader("Upload story (.txt)", type=["txt"], accept_multiple_files=False)
     if uploaded is not None:
-        os.makedirs("story", exist_ok=True)
         story_filename = os.path.join("story", os.path.basename(uploaded.name))
-        with open(story_filename, "wb") as f:
-            f.write(uploaded.read())
+        # The uploader hands back the same file on every rerun; only write it
+        # once per upload, and copy in chunks rather than one bytes copy.
+        upload_id = getattr(uploaded, "file_id", None) or (uploaded.name, uploaded.size)
+        if st.session_state.get("saved_upload_id") != upload_id:
+            os.makedirs("story", exist_ok=True)
+            uploaded.seek(0)
+            with open(story_filename, "wb") as f:
+                shutil.copyfileobj(uploaded, f, length=1024 * 1024)
+            st.session_state.saved_upload_id = upload_id
         st.session_state.story_path = story_filename
         st.success(f"Story saved: {story_filename}")
 with col0b:
-    if st.session_state.story_path:
-        with open(st.session_state.story_path, "r", encoding="utf-8", errors="ignore") as f:
-            st.text_area("Story preview", f.read(), height=240)
+    story_info = _stat(st.session_state.story_path)
+    if story_info:
+        st.text_area("Story preview", _read_text(st.session_state.story_path, limit=64 * 1024, info=story_info), height=240)
 
 # --- Optional: Full pipeline (async) ---
 st.header("Run full pipeline (async)")
@@ -132,7 +292,7 @@ with col0c:
 with col0d:
     if run_full:
         try:
-            resp = requests.post(
+            resp = _session().post(
                 f"{st.session_state.backend_url}/tasks/pipeline",
                 params={
                     "story_file": st.session_state.story_path,
@@ -143,7 +303,7 @@ with col0d:
                 timeout=30,
             )
             resp.raise_for_status()
-            st.session_state.last_task_id = resp.json().get("task_id", "")
+            _track_task(_json(resp).get("task_id", ""))
             st.success(f"Task queued: {st.session_state.last_task_id}")
         except Exception as e:
             st.error(f"Queueing failed: {e}")
@@ -157,20 +317,21 @@ with col1a:
 with col1b:
     if run_deconstruct:
         try:
-            resp = requests.post(
+            resp = _session().post(
                 f"{st.session_state.backend_url}/tasks/deconstruct",
                 params={"story_file": st.session_state.story_path, "project": project, "location": location},
                 timeout=30,
             )
             resp.raise_for_status()
-            st.session_state.last_task_id = resp.json().get("task_id", "")
+            _track_task(_json(resp).get("task_id", ""))
             st.success(f"Task queued: {st.session_state.last_task_id}")
         except Exception as e:
             st.error(f"Queueing failed: {e}")
 
-if st.session_state.schema_path and os.path.exists(st.session_state.schema_path):
+schema_info = _stat(st.session_state.schema_path)
+if schema_info:
     with st.expander("View schema JSON", expanded=False):
-        st.code(open(st.session_state.schema_path, "r").read(), language="json")
+        st.code(_read_text(st.session_state.schema_path, info=schema_info), language="json")
 
 
 # --- Step 2: Screenplay & Storyboard (async) ---
@@ -185,26 +346,26 @@ with col2a:
 with col2b:
     if run_script_and_board:
         try:
-            resp = requests.post(
+            resp = _session().post(
                 f"{st.session_state.backend_url}/tasks/screenplay",
                 params={"schema_file": st.session_state.schema_path, "project": project, "location": location},
                 timeout=30,
             )
             resp.raise_for_status()
-            st.session_state.last_task_id = resp.json().get("task_id", "")
+            _track_task(_json(resp).get("task_id", ""))
             st.success(f"Task queued: {st.session_state.last_task_id}")
         except Exception as e:
             st.error(f"Queueing failed: {e}")
 
 cols = st.columns(2)
-if st.session_state.screenplay_path and os.path.exists(st.session_state.screenplay_path):
+screenplay_info = _stat(st.session_state.screenplay_path)
+if screenplay_info:
     with cols[0]:
-        with open(st.session_state.screenplay_path, "r", encoding="utf-8", errors="ignore") as f:
-            st.text_area("Screenplay", f.read(), height=260)
-if st.session_state.storyboard_path and os.path.exists(st.session_state.storyboard_path):
+        st.text_area("Screenplay", _read_text(st.session_state.screenplay_path, info=screenplay_info), height=260)
+storyboard_info = _stat(st.session_state.storyboard_path)
+if storyboard_info:
     with cols[1]:
-        with open(st.session_state.storyboard_path, "r", encoding="utf-8", errors="ignore") as f:
-            st.text_area("Storyboard", f.read(), height=260)
+        st.text_area("Storyboard", _read_text(st.session_state.storyboard_path, info=storyboard_info), height=260)
 
 
 # --- Step 3: Visual assets (async) ---
@@ -219,7 +380,7 @@ with col3a:
 with col3b:
     if run_assets:
         try:
-            resp = requests.post(
+            resp = _session().post(
                 f"{st.session_state.backend_url}/tasks/assets",
                 params={
                     "storyboard_file": st.session_state.storyboard_path,
@@ -231,7 +392,7 @@ with col3b:
                 timeout=30,
             )
             resp.raise_for_status()
-            st.session_state.last_task_id = resp.json().get("task_id", "")
+            _track_task(_json(resp).get("task_id", ""))
             st.success(f"Task queued: {st.session_state.last_task_id}")
         except Exception as e:
             st.error(f"Queueing failed: {e}")
@@ -242,50 +403,145 @@ if st.session_state.get("last_task_id"):
     cols = st.columns([1,1,3])
     with cols[0]:
         st.write(f"Task ID: {st.session_state.last_task_id}")
+        if st.button("Clear", use_container_width=True):
+            _track_task("")
+            st.rerun()
     with cols[1]:
         if st.button("Refresh status", use_container_width=True):
             try:
-                res = requests.get(f"{st.session_state.backend_url}/tasks/{st.session_state.last_task_id}", timeout=30)
-                res.raise_for_status()
-                data = res.json()
-                st.session_state.last_task_state = data.get("state", "")
-                st.session_state.last_task_result = data.get("result")
-                if st.session_state.last_task_state == "SUCCESS":
-                    _maybe_update_paths_from_result(st.session_state.last_task_result)
+                _poll_task_status(timeout=30)
             except Exception as e:
                 st.error(f"Status check failed: {e}")
+        elif st.session_state.auto_refresh and st.session_state.last_task_state not in _TERMINAL_TASK_STATES:
+            # Auto-refresh: one status request per rerun, skipped when the
+            # button already polled and once the task has finished.
+            try:
+                _auto_poll_task_status()
+            except Exception:
+                pass
     with cols[2]:
         st.write(f"State: {st.session_state.get('last_task_state')}")
         if st.session_state.get("last_task_result"):
             st.json(st.session_state.last_task_result)
 
-    # Auto-refresh on rerun
-    if st.session_state.auto_refresh:
-        try:
-            res = requests.get(f"{st.session_state.backend_url}/tasks/{st.session_state.last_task_id}", timeout=15)
-            if res.ok:
-                data = res.json()
-                st.session_state.last_task_state = data.get("state", "")
-                st.session_state.last_task_result = data.get("result")
-                if st.session_state.last_task_state == "SUCCESS":
-                    _maybe_update_paths_from_result(st.session_state.last_task_result)
-        except Exception:
-            pass
-        # Trigger a timed rerun
+    if st.session_state.auto_refresh and st.session_state.last_task_state not in _TERMINAL_TASK_STATES:
+        # Trigger a timed rerun; a finished task has nothing left to poll
         st.autorefresh(interval=st.session_state.refresh_ms, key="task_autorefresh")
 
-images = sorted(glob.glob(os.path.join("output", "storyboard_images", "*.png")))
+images_dir = os.path.join("output", "storyboard_images")
+images = _list_pngs(images_dir, os.path.getmtime(images_dir)) if os.path.isdir(images_dir) else []
 if images:
     st.caption("Generated images")
-    grid_cols = st.columns(3)
-    for idx, img in enumerate(images):
-        grid_cols[idx % 3].image(img, caption=os.path.basename(img), use_container_width=True)
+    # Render one scene at a time so the grid stays cheap as images pile up.
+    buckets = _images_by_scene(images)
+    scene = st.selectbox(
+        "Scene",
+        options=sorted(buckets),
+        format_func=lambda n: f"Scene {n}" if n else "Other",
+        key="image_scene",
+    )
+    if public_backend_url:
+        # A single markdown element instead of one image widget per shot.
+        st.markdown(_image_grid_html(public_backend_url, buckets.get(scene, [])), unsafe_allow_html=True)
+    else:
+        # Local paths cannot be used as <img> sources, so fall back to st.image.
+        grid_cols = st.columns(3)
+        for idx, img in enumerate(buckets.get(scene, [])):
+            grid_cols[idx % 3].image(img, caption=os.path.basename(img), use_container_width=True)
 
 
 # --- Step 4: Video synthesis ---
 st.header("Step 4 · Video synthesis (preview)")
 st.info("Veo integration is a placeholder in this repo. You can still assemble a cut using FFmpeg from available clips when implemented.")
 
+
+# --- Step 5: Soundtrack (async) ---
+st.header("Step 5 · Soundtrack")
+col5a, col5b = st.columns([1, 2])
+with col5a:
+    run_soundtrack = st.button(
+        "Generate soundtrack (async)",
+        use_container_width=True,
+        disabled=not (st.session_state.schema_path and project and location),
+    )
+with col5b:
+    if run_soundtrack:
+        try:
+            resp = _session().post(
+                f"{st.session_state.backend_url}/tasks/soundtrack",
+                params={"schema_file": st.session_state.schema_path, "project": project, "location": location},
+                timeout=30,
+            )
+            resp.raise_for_status()
+            _track_task(_json(resp).get("task_id", ""))
+            st.success(f"Task queued: {st.session_state.last_task_id}")
+        except Exception as e:
+            st.error(f"Queueing failed: {e}")
+    if st.session_state.soundtrack_dir:
+        st.success(f"Soundtracks saved in: {st.session_state.soundtrack_dir}")
+
+
+# --- Step 6: Voice-over (async) ---
+st.header("Step 6 · Voice-over")
+col6a, col6b = st.columns([1, 2])
+with col6a:
+    run_voiceover = st.button(
+        "Generate voice-over (async)",
+        use_container_width=True,
+        disabled=not (st.session_state.screenplay_path and project),
+    )
+with col6b:
+    if run_voiceover:
+        try:
+            resp = _session().post(
+                f"{st.session_state.backend_url}/tasks/voiceover",
+                params={"screenplay_file": st.session_state.screenplay_path, "project": project},
+                timeout=30,
+            )
+            resp.raise_for_status()
+            _track_task(_json(resp).get("task_id", ""))
+            st.success(f"Task queued: {st.session_state.last_task_id}")
+        except Exception as e:
+            st.error(f"Queueing failed: {e}")
+    if _stat(st.session_state.voiceover_file):
+        st.audio(st.session_state.voiceover_file, format="audio/mp3")
+
+
+# --- Step 7: Final assembly (async) ---
+st.header("Step 7 · Final assembly")
+col7a, col7b = st.columns([1, 2])
+with col7a:
+    run_final = st.button(
+        "Assemble final film (async)",
+        use_container_width=True,
+        disabled=not (
+            st.session_state.video_file
+            and st.session_state.soundtrack_dir
+            and st.session_state.voiceover_file
+            and st.session_state.project_name
+        ),
+    )
+with col7b:
+    if run_final:
+        try:
+            resp = _session().post(
+                f"{st.session_state.backend_url}/tasks/assemble",
+                params={
+                    "video_clips_dir": os.path.dirname(st.session_state.video_file),
+                    "voiceover_dir": os.path.dirname(st.session_state.voiceover_file),
+                    "soundtrack_dir": st.session_state.soundtrack_dir,
+                    "project": st.session_state.project_name,
+                },
+                timeout=30,
+            )
+            resp.raise_for_status()
+            _track_task(_json(resp).get("task_id", ""))
+            st.success(f"Task queued: {st.session_state.last_task_id}")
+        except Exception as e:
+            st.error(f"Queueing failed: {e}")
+    if _stat(st.session_state.final_film_file):
+        st.video(st.session_state.final_film_file)
+
 st.markdown("---")
 st.caption("Tip: Ensure your Vertex AI credentials are correctly mounted inside the container.")
 
@@ -294,9 +550,15 @@ st.caption("Tip: Ensure your Vertex AI credentials are correctly mounted inside
 st.header("Project state")
 cols_state = st.columns([1, 3])
 with cols_state[0]:
+    # Ask for the list and the currently selected project's state together.
+    expanded = st.session_state.selected_project
+    expanded_state = None
     try:
-        resp = requests.get(f"{st.session_state.backend_url}/projects", timeout=10)
-        projects = resp.json().get("projects", []) if resp.ok else []
+        params = {"expand": expanded} if expanded else None
+        resp = _session().get(f"{st.session_state.backend_url}/projects", params=params, timeout=10)
+        payload = _json(resp) if resp.ok else {}
+        projects = payload.get("projects", [])
+        expanded_state = payload.get("state")
     except Exception:
         projects = []
     if projects:
@@ -307,9 +569,12 @@ with cols_state[0]:
 with cols_state[1]:
     if st.session_state.selected_project:
         try:
-            res = requests.get(f"{st.session_state.backend_url}/projects/{st.session_state.selected_project}", timeout=15)
-            if res.ok:
-                state = res.json()
+            state = expanded_state if st.session_state.selected_project == expanded else None
+            if state is None:
+                # Selection just changed (or the expand missed): fetch it directly.
+                res = _session().get(f"{st.session_state.backend_url}/projects/{st.session_state.selected_project}", timeout=15)
+                state = _json(res) if res.ok else None
+            if state is not None:
                 arts = state.get("artifacts", {})
                 st.subheader(f"{state.get('project')}")
                 st.caption(f"Updated: {state.get('updated_at')}")
@@ -321,6 +586,9 @@ with cols_state[1]:
                     "storyboard_generated",
                     "visual_assets_generated",
                     "video_synthesized",
+                    "soundtrack_generated",
+                    "voiceover_generated",
+                    "final_film_assembled",
                 ]:
                     step = steps.get(key, {})
                     status = step.get("status", "not_started")